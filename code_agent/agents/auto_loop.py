@@ -0,0 +1,160 @@
+"""Auto loop - issue to approved PR in one process (process, review, fix, repeat)."""
+
+import hashlib
+import logging
+import time
+from typing import Any
+
+from code_agent.agents.code_agent import CodeAgent
+from code_agent.agents.reviewer_agent import ReviewerAgent
+from code_agent.config import settings
+from code_agent.core.github_client import GitHubClient
+from code_agent.core.llm import LLMService
+from code_agent.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+class AutoLoop:
+    """Run ``process_issue`` then alternate review and fix until the PR is approved.
+
+    Both agents share one GitHub client, LLM service and local checkout, and the
+    issue text is fetched once, so each iteration only pays for the PR-specific work.
+    """
+
+    # GitHub can report the previous PR head for a while after a push.
+    HEAD_WAIT_TIMEOUT = 60.0
+    HEAD_POLL_INTERVAL = 2.0
+
+    def __init__(
+        self,
+        github_client: GitHubClient | None = None,
+        llm_service: LLMService | None = None,
+        repo_path: str | None = None,
+        max_iterations: int | None = None,
+    ) -> None:
+        """Initialize Auto Loop."""
+        self.github_client = github_client or GitHubClient()
+        self.llm_service = llm_service or LLMService()
+        self.code_agent = CodeAgent(
+            github_client=self.github_client, llm_service=self.llm_service, repo_path=repo_path
+        )
+        self.reviewer = ReviewerAgent(
+            github_client=self.github_client,
+            llm_service=self.llm_service,
+            git_repo=self.code_agent.git_repo,
+        )
+        self.max_iterations = settings.max_iterations if max_iterations is None else max_iterations
+
+    @traced()
+    def run(self, issue_number: int) -> dict[str, Any]:
+        """Drive one issue to an approved PR (or until no further progress is made)."""
+        result: dict[str, Any] = {"issue_number": issue_number, "iterations": 0, "history": []}
+
+        created = self.code_agent.process_issue(issue_number)
+        if not created.get("success"):
+            return {**result, "success": False, "stop_reason": "process_failed", **created}
+
+        pr_number = created["pr_number"]
+        result.update(pr_number=pr_number, branch=created.get("branch"))
+        if created.get("demo_mode"):
+            # No real PR to iterate on; review the local artifacts once.
+            review = self.reviewer.review_pull_request(0)
+            return self._finish(result, review, "demo_mode")
+
+        issue = self.github_client.get_issue_details(issue_number)
+        issue_description = f"{issue['title']}\n\n{issue['body']}"
+
+        review = self._review(pr_number, issue_description, result)
+        seen = {self._fingerprint(review)}
+        for iteration in range(1, self.max_iterations + 1):
+            if review.get("approved"):
+                return self._finish(result, review, "approved")
+
+            started = time.monotonic()
+            fixed = self.code_agent.fix_pr_issues(
+                pr_number,
+                review.get("feedback", ""),
+                iteration,
+                issue_description=issue_description,
+                max_iterations=self.max_iterations,
+            )
+            result["iterations"] = iteration
+            result["history"].append(
+                {
+                    "step": "fix",
+                    "iteration": iteration,
+                    "success": fixed.get("success", False),
+                    "files_modified": fixed.get("files_modified", []),
+                    "duration_s": round(time.monotonic() - started, 2),
+                }
+            )
+            if not fixed.get("success"):
+                logger.warning(f"Fix iteration {iteration} made no changes: {fixed.get('error')}")
+                return self._finish(result, review, "no_progress")
+            if not self._wait_for_head(pr_number, fixed.get("commit_sha")):
+                return self._finish(result, review, "head_not_updated")
+
+            review = self._review(pr_number, issue_description, result)
+            fingerprint = self._fingerprint(review)
+            if not review.get("approved") and fingerprint in seen:
+                logger.warning("Review feedback repeated after a fix; stopping")
+                return self._finish(result, review, "no_progress")
+            seen.add(fingerprint)
+
+        reason = "approved" if review.get("approved") else "max_iterations"
+        return self._finish(result, review, reason)
+
+    def _wait_for_head(self, pr_number: int, sha: str | None) -> bool:
+        """Wait until GitHub reports ``sha`` as the PR head, so the review sees the fix."""
+        if not sha:
+            return True
+        deadline = time.monotonic() + self.HEAD_WAIT_TIMEOUT
+        while True:
+            if self.github_client.get_pull_request(pr_number).head.sha == sha:
+                return True
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    f"PR #{pr_number} head is still not {sha[:12]} after "
+                    f"{self.HEAD_WAIT_TIMEOUT:g}s; stopping"
+                )
+                return False
+            time.sleep(self.HEAD_POLL_INTERVAL)
+
+    def _review(
+        self, pr_number: int, issue_description: str, result: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Review the current PR head and record it in the history."""
+        started = time.monotonic()
+        review = self.reviewer.review_pull_request(pr_number, issue_description=issue_description)
+        result["history"].append(
+            {
+                "step": "review",
+                "approved": bool(review.get("approved")),
+                "issues": review.get("issues", []),
+                "duration_s": round(time.monotonic() - started, 2),
+            }
+        )
+        return review
+
+    def _fingerprint(self, review: dict[str, Any]) -> str:
+        """Identify a review's content, ignoring whitespace differences."""
+        text = (
+            " ".join(review.get("feedback", "").split())
+            + "\0"
+            + "\0".join(sorted(review.get("issues", [])))
+        )
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _finish(
+        self, result: dict[str, Any], review: dict[str, Any], reason: str
+    ) -> dict[str, Any]:
+        approved = bool(review.get("approved"))
+        logger.info(f"Auto loop stopped ({reason}) after {result['iterations']} fix iteration(s)")
+        return {
+            **result,
+            "success": approved,
+            "approved": approved,
+            "stop_reason": reason,
+            "feedback": review.get("feedback", ""),
+        }
@@ -0,0 +1,153 @@
+"""Batch runner - processes queued issues with a bounded pool of Code Agents."""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from code_agent.agents.code_agent import CodeAgent
+from code_agent.config import settings
+from code_agent.core.issue_queue import STALE_AFTER, IssueQueue, QueuedIssue
+from code_agent.utils.logger import log_context
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats for the jobs this process is running.
+HEARTBEAT_INTERVAL = STALE_AFTER / 10
+
+
+class BatchRunner:
+    """Drain an ``IssueQueue`` for one repository with concurrent workers."""
+
+    def __init__(
+        self,
+        queue: IssueQueue,
+        repo: str,
+        agent_factory: Callable[[], CodeAgent],
+        workers: int = 2,
+        max_per_repo: int = 1,
+        on_result: Callable[[dict[str, Any]], None] | None = None,
+    ) -> None:
+        """Initialize Batch Runner."""
+        if max_per_repo > 1 and not settings.checkout_free_commits:
+            # Without checkout-free commits every run switches branches in the shared
+            # working tree, so runs on the same clone must not overlap.
+            logger.warning(
+                "max_per_repo=%d requires CHECKOUT_FREE_COMMITS=true; using 1", max_per_repo
+            )
+            max_per_repo = 1
+
+        self.queue = queue
+        self.repo = repo
+        self.agent_factory = agent_factory
+        self.workers = max(1, workers)
+        self.on_result = on_result
+        self._repo_slots = threading.BoundedSemaphore(max(1, max_per_repo))
+        self._stats_lock = threading.Lock()
+        self._processed = 0
+        self._succeeded = 0
+        self._started_at = 0.0
+
+    def run(self) -> dict[str, Any]:
+        """Process pending issues until the queue is empty; returns throughput stats."""
+        requeued = self.queue.requeue_stale(self.repo)
+        if requeued:
+            logger.info(f"Requeued {requeued} issue(s) left running by a previous run")
+
+        self._started_at = time.monotonic()
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(stop,), name="queue-heartbeat", daemon=True
+        )
+        heartbeat.start()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="issue-worker"
+            ) as pool:
+                for future in [pool.submit(self._worker, i) for i in range(self.workers)]:
+                    future.result()
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        return self._stats()
+
+    def _heartbeat(self, stop: threading.Event) -> None:
+        """Keep this process's running jobs from being requeued by other runners."""
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.queue.heartbeat()
+            except Exception as e:
+                logger.warning("Queue heartbeat failed (%s): %s", type(e).__name__, e)
+
+    def _worker(self, worker_id: int) -> None:
+        """Claim and process issues until none are pending."""
+        agent: CodeAgent | None = None
+
+        while True:
+            with self._repo_slots:
+                job = self.queue.claim(self.repo)
+                if job is None:
+                    return
+                agent = self._process(agent, job, worker_id)
+
+    def _process(
+        self, agent: CodeAgent | None, job: QueuedIssue, worker_id: int
+    ) -> CodeAgent | None:
+        """Run one issue through the agent and record the outcome.
+
+        The worker's agent is created on first use; if that fails the job is marked
+        failed like any other error. Returns the agent for the worker's next job.
+        """
+        logger.info(
+            f"[worker {worker_id}] Processing issue #{job.issue_number} (priority {job.priority})"
+        )
+        started = time.monotonic()
+        try:
+            if agent is None:
+                agent = self.agent_factory()
+            with log_context(issue=job.issue_number, job=job.job_id):
+                result = agent.process_issue(job.issue_number)
+        except Exception as e:
+            logger.error(f"Issue #{job.issue_number} failed: {e}")
+            result = {"success": False, "error": f"{type(e).__name__}: {e}"}
+        duration = time.monotonic() - started
+
+        success = bool(result.get("success"))
+        self.queue.complete(job.job_id, success, result)
+
+        with self._stats_lock:
+            self._processed += 1
+            self._succeeded += int(success)
+
+        if self.on_result:
+            self.on_result(
+                {
+                    "event": "result",
+                    "issue_number": job.issue_number,
+                    "priority": job.priority,
+                    "attempt": job.attempts,
+                    "worker": worker_id,
+                    "success": success,
+                    "pr_number": result.get("pr_number"),
+                    "files_modified": result.get("files_modified", []),
+                    "error": result.get("error"),
+                    "duration_s": round(duration, 3),
+                    **self._stats(),
+                }
+            )
+        return agent
+
+    def _stats(self) -> dict[str, Any]:
+        """Running throughput statistics."""
+        with self._stats_lock:
+            elapsed = time.monotonic() - self._started_at
+            return {
+                "processed": self._processed,
+                "succeeded": self._succeeded,
+                "failed": self._processed - self._succeeded,
+                "elapsed_s": round(elapsed, 3),
+                "throughput_per_min": round(self._processed * 60 / elapsed, 2) if elapsed else 0.0,
+            }
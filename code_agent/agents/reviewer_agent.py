@@ -2,12 +2,18 @@
 
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 from code_agent.config import settings
-from code_agent.core.github_client import GitHubClient
+from code_agent.core.checkpoint import RunCheckpoint, find_review_state, review_state_marker
+from code_agent.core.ci_logs import MAX_LOG_JOBS, extract_failure_windows, failure_digest
+from code_agent.core.github_client import GitHubClient, GitRepo
 from code_agent.core.llm import LLMService
+from code_agent.core.prereview import format_findings, prereview
+from code_agent.core.review_split import pack_pieces
+from code_agent.utils.tracing import bind_context, current_span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -20,15 +26,26 @@ class ReviewerAgent:
         github_client: GitHubClient | None = None,
         llm_service: LLMService | None = None,
         repo_path: str | None = None,
+        git_repo: GitRepo | None = None,
     ) -> None:
         """Initialize Reviewer Agent."""
         self.github_client = github_client or GitHubClient()
         self.llm_service = llm_service or LLMService()
-        self.repo_path = repo_path
-
-    def review_pull_request(self, pr_number: int) -> dict[str, Any]:
-        """Review a pull request and provide feedback."""
+        self.repo_path = repo_path or (git_repo.repo_path if git_repo else None)
+        self.git_repo = git_repo
+        # (old, new) commits of the last diff computed locally, for reading file contents.
+        self._diff_range: tuple[str, str] | None = None
+
+    @traced()
+    def review_pull_request(
+        self, pr_number: int, issue_description: str | None = None
+    ) -> dict[str, Any]:
+        """Review a pull request and provide feedback.
+
+        ``issue_description`` skips fetching the linked issue when the caller has it.
+        """
         logger.info(f"Reviewing PR #{pr_number}")
+        current_span().set_attribute("pr.number", pr_number)
         logger.info(
             "Review target repo=%s (api_repo_url=%s)",
             getattr(self.github_client, "repo_name", "unknown"),
@@ -42,18 +59,26 @@ class ReviewerAgent:
         # Get PR details
         pr = self.github_client.get_pull_request(pr_number)
 
-        # Extract issue number
-        issue_number = self._extract_issue_number(pr.body or "")
+        if issue_description is None:
+            # Extract issue number
+            issue_number = self._extract_issue_number(pr.body or "")
 
-        if not issue_number:
-            logger.warning("Could not find related issue number")
-            issue_description = pr.title
-        else:
-            issue_details = self.github_client.get_issue_details(issue_number)
-            issue_description = f"{issue_details['title']}\n\n{issue_details['body']}"
+            if not issue_number:
+                logger.warning("Could not find related issue number")
+                issue_description = pr.title
+            else:
+                issue_details = self.github_client.get_issue_details(issue_number)
+                issue_description = f"{issue_details['title']}\n\n{issue_details['body']}"
 
-        # Get PR diff
-        pr_diff = self.github_client.get_pr_diff(pr_number)
+        # Get PR diff: only the new commits if an earlier review of this PR exists
+        previous_review = self._previous_review(pr_number, pr.head.sha)
+        self._diff_range = None
+        pr_diff = ""
+        if previous_review:
+            pr_diff = self._get_incremental_diff(pr_number, pr, previous_review["head"])
+        if not pr_diff.strip():
+            previous_review = None
+            pr_diff = self._get_pr_diff(pr_number, pr.base.ref)
 
         if not pr_diff.strip():
             logger.warning("PR has no changes")
@@ -65,26 +90,280 @@ class ReviewerAgent:
 
         # Get CI/CD results
         ci_results = None
+        ci_failed = False
         if settings.enable_ci_analysis:
             try:
                 checks = self.github_client.get_pr_checks(pr_number)
                 ci_results = self._format_ci_results(checks)
+                ci_failed = any(
+                    check.get("conclusion") in ("failure", "timed_out", "cancelled")
+                    for check in checks
+                )
+                if ci_failed and settings.ci_log_digest:
+                    digest = self._ci_failure_digest(checks)
+                    if digest:
+                        ci_results += "\n\n" + digest
             except Exception as e:
                 logger.warning(f"Could not get CI results: {e}")
 
         # Perform code review using LLM
-        review_result = self.llm_service.review_code_changes(
-            pr_diff, issue_description, ci_results
+        review_result = self._review_diff(
+            pr_diff,
+            issue_description,
+            ci_results,
+            previous_review,
+            prereview=self._prereview(pr_diff),
+            ci_failed=ci_failed,
         )
+        review_result["reviewed_sha"] = pr.head.sha
+        review_result["incremental"] = previous_review is not None
 
         logger.info(f"Review complete: {'approved' if review_result['approved'] else 'changes requested'}")
 
         # Post review to GitHub
         if not settings.demo_mode:
             self._post_review(pr_number, review_result)
+            self._store_review(pr_number, pr.head.sha, review_result)
 
         return review_result
 
+    def _review_store(self) -> RunCheckpoint | None:
+        """Local store of review results (needs a local clone)."""
+        if not self.repo_path:
+            return None
+        try:
+            if self.git_repo is None:
+                self.git_repo = GitRepo(self.repo_path)
+            repo_name = getattr(self.github_client, "repo_name", "") or "unknown"
+            return RunCheckpoint(self.git_repo.state_dir("reviews", repo_name.replace("/", "__")))
+        except Exception as e:
+            logger.warning("Review store unavailable (%s): %s", type(e).__name__, e)
+            return None
+
+    def _store_review(self, pr_number: int, head_sha: str, review_result: dict[str, Any]) -> None:
+        """Remember the review of this PR head for ``generate_review_summary``."""
+        store = self._review_store()
+        if store is not None:
+            store.save(f"pr-{pr_number}-{head_sha}", review_result)
+
+    def _stored_review(self, pr_number: int) -> dict[str, Any] | None:
+        """Review of the PR's current head from the local store or the posted review marker."""
+        head_sha = self.github_client.get_pull_request(pr_number).head.sha
+
+        store = self._review_store()
+        if store is not None:
+            stored = store.load(f"pr-{pr_number}-{head_sha}")
+            if stored is not None:
+                logger.info(f"Using stored review of PR #{pr_number} at {head_sha[:12]}")
+                return stored
+
+        try:
+            state = find_review_state(self.github_client.list_pr_review_bodies(pr_number))
+        except Exception as e:
+            logger.warning("Could not read previous reviews (%s): %s", type(e).__name__, e)
+            return None
+        if state is None or state["head"] != head_sha:
+            return None
+        logger.info(f"Using posted review of PR #{pr_number} at {head_sha[:12]}")
+        return {
+            "approved": bool(state.get("approved")),
+            "feedback": state.get("feedback", ""),
+            "issues": state.get("issues", []),
+        }
+
+    def _previous_review(self, pr_number: int, head_sha: str) -> dict[str, Any] | None:
+        """State of the last posted review if it covered an earlier head of this PR."""
+        if not settings.review_incremental or settings.demo_mode:
+            return None
+        try:
+            state = find_review_state(self.github_client.list_pr_review_bodies(pr_number))
+        except Exception as e:
+            logger.warning("Could not read previous reviews (%s): %s", type(e).__name__, e)
+            return None
+        if state is None or state["head"] == head_sha:
+            # Same head again (e.g. CI changed): review the whole PR as before.
+            return None
+        return state
+
+    @traced()
+    def _get_incremental_diff(self, pr_number: int, pr: Any, since: str) -> str:
+        """Diff of the commits pushed since ``since`` ("" if it cannot be computed)."""
+        if self.repo_path and settings.review_local_diff:
+            try:
+                if self.git_repo is None:
+                    self.git_repo = GitRepo(self.repo_path)
+                diff = self.git_repo.get_range_diff(
+                    pr_number,
+                    pr.base.ref,
+                    since,
+                    function_context=settings.review_function_context,
+                )
+                logger.info(f"Reviewing PR #{pr_number} changes since {since[:12]} only")
+                self._remember_range(pr_number, since)
+                return diff
+            except Exception as e:
+                logger.warning(
+                    "Local incremental diff failed (%s: %s); trying GitHub API",
+                    type(e).__name__,
+                    e,
+                )
+
+        try:
+            diff = self.github_client.get_compare_diff(since, pr.head.sha)
+            logger.info(f"Reviewing PR #{pr_number} changes since {since[:12]} only")
+            return diff
+        except Exception as e:
+            logger.warning(
+                "Incremental diff failed (%s: %s); reviewing the whole PR", type(e).__name__, e
+            )
+            return ""
+
+    def _remember_range(self, pr_number: int, since: str | None = None) -> None:
+        try:
+            self._diff_range = self.git_repo.pull_request_range(pr_number, since)
+        except Exception as e:
+            logger.debug("Could not resolve PR #%s diff range: %s", pr_number, e)
+
+    @traced()
+    def _prereview(self, diff: str) -> dict[str, Any] | None:
+        """Classify the diff statically (file contents are used when diffed locally)."""
+        if not settings.review_prereview:
+            return None
+
+        read_old = read_new = None
+        if self._diff_range and self.git_repo is not None:
+            git_repo = self.git_repo
+            old_sha, new_sha = self._diff_range
+
+            def reader(ref: str) -> Any:
+                def read(path: str) -> str | None:
+                    try:
+                        return git_repo.get_file_content_at(ref, path)
+                    except Exception:
+                        return None
+
+                return read
+
+            read_old, read_new = reader(old_sha), reader(new_sha)
+
+        try:
+            result = prereview(
+                diff,
+                read_old,
+                read_new,
+                repo_root=self.repo_path,
+                small_lines=settings.prereview_small_lines,
+            )
+        except Exception as e:
+            logger.warning("Pre-review failed (%s): %s", type(e).__name__, e)
+            return None
+        logger.info(
+            f"Pre-review: {result['kind']} ({result['changed_lines']} changed code lines, "
+            f"{len(result['findings'])} static findings)"
+        )
+        return result
+
+    @traced()
+    def _review_diff(
+        self,
+        diff: str,
+        issue_description: str,
+        ci_results: str | None,
+        previous_review: dict[str, Any] | None = None,
+        prereview: dict[str, Any] | None = None,
+        ci_failed: bool = False,
+    ) -> dict[str, Any]:
+        """Review a diff in one call, or per file in parallel when it is large.
+
+        Large diffs are split into pieces of about ``review_split_chars``; each piece is
+        reviewed concurrently and one aggregation call (summaries only, no diff) gives
+        the final verdict, so wall-clock time follows the largest piece. With a
+        ``prereview`` classification, formatting-only diffs verified against both
+        file versions are approved without the LLM and other trivial diffs get a short
+        prompt; static findings are passed on.
+        """
+        if prereview:
+            if prereview["findings"]:
+                ci_results = "\n\n".join(
+                    part for part in (ci_results, format_findings(prereview["findings"])) if part
+                )
+            outstanding = bool(previous_review and previous_review.get("issues"))
+            if (
+                prereview["kind"] == "formatting"
+                and prereview.get("verified")
+                and not prereview["findings"]
+                and not ci_failed
+                and not outstanding
+            ):
+                logger.info("Formatting-only change; approving without LLM review")
+                return {
+                    "approved": True,
+                    "feedback": (
+                        "Formatting-only change (no semantic difference in "
+                        f"{', '.join(prereview['files']) or 'the diff'}); "
+                        "approved without LLM review."
+                    ),
+                    "issues": [],
+                    "prereview": prereview,
+                }
+            if prereview["kind"] in ("formatting", "docs", "small"):
+                review = self.llm_service.quick_review(
+                    diff, issue_description, ci_results, previous_review=previous_review
+                )
+                return {**review, "prereview": prereview}
+
+        pieces = pack_pieces(diff, settings.review_split_chars)
+        if len(pieces) <= 1:
+            return self.llm_service.review_code_changes(
+                diff, issue_description, ci_results, previous_review=previous_review
+            )
+
+        logger.info(f"Reviewing diff in {len(pieces)} parts")
+        with ThreadPoolExecutor(
+            max_workers=max(1, settings.review_workers), thread_name_prefix="review"
+        ) as pool:
+            reviews = list(
+                pool.map(
+                    bind_context(
+                        lambda piece: self.llm_service.review_diff_piece(
+                            piece.text, piece.label, issue_description
+                        )
+                    ),
+                    pieces,
+                )
+            )
+
+        return self.llm_service.aggregate_reviews(
+            [(piece.label, review) for piece, review in zip(pieces, reviews, strict=True)],
+            issue_description,
+            ci_results,
+            previous_review=previous_review,
+        )
+
+    @traced()
+    def _get_pr_diff(self, pr_number: int, base_branch: str) -> str:
+        """Get the PR diff, preferring git in the local clone over the REST files API."""
+        if self.repo_path and settings.review_local_diff:
+            try:
+                if self.git_repo is None:
+                    self.git_repo = GitRepo(self.repo_path)
+                diff = self.git_repo.get_pull_request_diff(
+                    pr_number,
+                    base_branch,
+                    function_context=settings.review_function_context,
+                )
+                logger.info(f"Computed PR #{pr_number} diff locally ({len(diff)} chars)")
+                self._remember_range(pr_number)
+                return diff
+            except Exception as e:
+                logger.warning(
+                    "Local PR diff failed (%s: %s); falling back to GitHub API",
+                    type(e).__name__,
+                    e,
+                )
+
+        return self.github_client.get_pr_diff(pr_number)
+
     def _review_demo_artifacts(self) -> dict[str, Any]:
         """Review latest demo diff artifact saved by CodeAgent (DEMO_MODE)."""
         repo_path = self.repo_path or "."
@@ -132,11 +411,36 @@ class ReviewerAgent:
             }
 
         ci_results = "DEMO_MODE: CI not executed (local artifact review)."
-        review_result = self.llm_service.review_code_changes(pr_diff, issue_description, ci_results)
+        review_result = self._review_diff(pr_diff, issue_description, ci_results)
         review_result["demo_mode"] = True
         review_result["diff_path"] = str(diff_path)
         return review_result
 
+    @traced()
+    def _ci_failure_digest(self, checks: list[dict[str, Any]]) -> str:
+        """Error windows from the logs of failed checks (streamed, never held whole)."""
+        failed = [
+            check
+            for check in checks
+            if check.get("conclusion") in ("failure", "timed_out") and check.get("id")
+        ]
+        failures = []
+        for check in failed[:MAX_LOG_JOBS]:
+            try:
+                windows = extract_failure_windows(
+                    self.github_client.iter_job_log_lines(check["id"]),
+                    context=settings.ci_log_context_lines,
+                    max_windows=settings.ci_log_max_windows,
+                )
+            except Exception as e:
+                # Not every check run is an Actions job with a downloadable log.
+                logger.warning(
+                    "Could not read log of check '%s' (%s): %s", check["name"], type(e).__name__, e
+                )
+                continue
+            failures.append((check["name"], windows))
+        return failure_digest(failures, max_chars=settings.ci_digest_chars)
+
     def _format_ci_results(self, checks: list[dict[str, Any]]) -> str:
         """Format CI/CD check results."""
         if not checks:
@@ -151,6 +455,7 @@ class ReviewerAgent:
 
         return result
 
+    @traced()
     def _post_review(self, pr_number: int, review_result: dict[str, Any]) -> None:
         """Post review results to GitHub PR."""
         approved = review_result.get("approved", False)
@@ -171,6 +476,15 @@ class ReviewerAgent:
                     body += f"{i}. {issue}\n"
 
         body += "\n\n---\n*This review was automatically generated by AI Reviewer Agent.*"
+        if review_result.get("reviewed_sha"):
+            # Lets the next review cover only the commits pushed after this one.
+            state = {
+                "head": review_result["reviewed_sha"],
+                "approved": approved,
+                "issues": issues,
+                "feedback": feedback[:2000],
+            }
+            body += "\n\n" + review_state_marker(state)
 
         try:
             self.github_client.create_review(
@@ -199,12 +513,21 @@ class ReviewerAgent:
 
         return None
 
+    @traced()
     def generate_review_summary(self, pr_number: int) -> str:
-        """Generate a summary of the review for GitHub Actions."""
+        """Generate a summary of the review for GitHub Actions.
+
+        Renders the stored review of the current PR head when ``review-pr`` already ran
+        for it; only reviews (and posts) again if there is none.
+        """
         logger.info(f"Generating review summary for PR #{pr_number}")
 
         try:
-            review_result = self.review_pull_request(pr_number)
+            review_result = None
+            if not (settings.demo_mode and pr_number == 0):
+                review_result = self._stored_review(pr_number)
+            if review_result is None:
+                review_result = self.review_pull_request(pr_number)
 
             summary = "# 🤖 AI Code Review Summary\n\n"
 
@@ -1,16 +1,26 @@
-"""CLI interface for Code Agent."""
+"""CLI interface for Code Agent.
 
+Agents, API clients and settings are imported inside the commands that use them, so
+short commands such as ``version`` and ``--help`` don't pay for openai, PyGithub,
+GitPython and pydantic at start-up.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
 import logging
+import os
 import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
-from rich.console import Console
-from rich.logging import RichHandler
 
 from code_agent import __version__
-from code_agent.agents.code_agent import CodeAgent
-from code_agent.agents.reviewer_agent import ReviewerAgent
-from code_agent.config import settings
+
+if TYPE_CHECKING:
+    from rich.console import Console
 
 # Initialize Typer app
 app = typer.Typer(
@@ -19,23 +29,49 @@ app = typer.Typer(
     add_completion=False,
 )
 
-console = Console()
+LOG_LEVEL_HELP = "Logging level (default: LOG_LEVEL setting)"
+TRACE_OUT_HELP = "Write an OTLP/JSON trace of the run to this file"
+
+
+@functools.cache
+def get_console(stderr: bool = False) -> Console:
+    """Shared rich console for stdout (or stderr)."""
+    from rich.console import Console
+
+    return Console(stderr=stderr)
+
+
+def setup_logging(level: str | None = None, stderr: bool = False) -> None:
+    """Setup logging configuration.
+
+    Interactive terminals get rich output; elsewhere (CI job logs, pipes) logs are
+    JSON lines written from a background thread, unless LOG_FORMAT says otherwise.
+    """
+    from code_agent.config import settings
+
+    level = level or settings.log_level
+    stream = sys.stderr if stderr else sys.stdout
+    log_format = settings.log_format.lower()
+    if log_format == "json" or (log_format == "auto" and not stream.isatty()):
+        from code_agent.utils.logger import setup_logger
+
+        setup_logger("", level, json_format=True, stream=stream)
+        return
 
+    from rich.logging import RichHandler
 
-def setup_logging(level: str = "INFO") -> None:
-    """Setup logging configuration."""
     logging.basicConfig(
         level=level,
         format="%(message)s",
         datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True, console=console)],
+        handlers=[RichHandler(rich_tracebacks=True, console=get_console(stderr))],
     )
 
 
 @app.command()
 def version() -> None:
     """Show version information."""
-    console.print(f"Code Agent version: {__version__}")
+    typer.echo(f"Code Agent version: {__version__}")
 
 
 @app.command()
@@ -44,18 +80,21 @@ def process_issue(
     repo_path: str | None = typer.Option(
         None, "--repo-path", "-r", help="Path to local repository"
     ),
-    log_level: str = typer.Option(
-        settings.log_level, "--log-level", "-l", help="Logging level"
-    ),
+    log_level: str | None = typer.Option(None, "--log-level", "-l", help=LOG_LEVEL_HELP),
+    trace_out: str | None = typer.Option(None, "--trace-out", help=TRACE_OUT_HELP),
 ) -> None:
     """Process a GitHub issue and create a pull request."""
+    from code_agent.daemon import run
+
+    console = get_console()
     setup_logging(log_level)
 
     console.print(f"[bold blue]Processing issue #{issue_number}...[/bold blue]")
 
     try:
-        agent = CodeAgent(repo_path=repo_path)
-        result = agent.process_issue(issue_number)
+        result = run(
+            "process_issue", issue_number=issue_number, repo_path=repo_path, trace_out=trace_out
+        )
 
         if result.get("success"):
             if result.get("demo_mode"):
@@ -64,6 +103,9 @@ def process_issue(
                     console.print(f"  Local diff: {result['diff_path']}")
                 if result.get("pr_url"):
                     console.print(f"  PR: {result['pr_url']}")
+            elif result.get("reused"):
+                console.print("[bold green]✓[/bold green] Issue unchanged; existing pull request is up to date.")
+                console.print(f"  PR Number: #{result['pr_number']}")
             else:
                 console.print("[bold green]✓[/bold green] Successfully created pull request!")
                 console.print(f"  PR Number: #{result['pr_number']}")
@@ -83,24 +125,127 @@ def process_issue(
         sys.exit(1)
 
 
+@app.command()
+def process_issues(
+    issue_numbers: list[int] | None = typer.Argument(None, help="GitHub issue numbers to enqueue"),
+    label: list[str] | None = typer.Option(
+        None, "--label", help="Enqueue all open issues with this label (repeatable)"
+    ),
+    from_file: Path | None = typer.Option(
+        None,
+        "--from-file",
+        help='JSONL file with one {"issue": N, "priority": P} object per line',
+    ),
+    priority: int = typer.Option(0, "--priority", "-p", help="Priority for enqueued issues"),
+    force: bool = typer.Option(
+        False, "--force", help="Re-run issues that already finished successfully"
+    ),
+    workers: int = typer.Option(2, "--workers", "-w", help="Number of worker threads"),
+    max_per_repo: int = typer.Option(
+        1, "--max-per-repo", help="Concurrent issues per repository (>1 needs checkout-free commits)"
+    ),
+    queue_db: str | None = typer.Option(
+        None, "--queue-db", help="SQLite queue path (default: inside the repo's .git dir)"
+    ),
+    repo_path: str | None = typer.Option(
+        None, "--repo-path", "-r", help="Path to local repository"
+    ),
+    log_level: str | None = typer.Option(None, "--log-level", "-l", help=LOG_LEVEL_HELP),
+) -> None:
+    """Queue many issues and process them with a worker pool (results as JSON lines)."""
+    from code_agent.agents.batch_runner import BatchRunner
+    from code_agent.agents.code_agent import CodeAgent
+    from code_agent.core.github_client import GitHubClient, GitRepo
+    from code_agent.core.issue_queue import IssueQueue
+    from code_agent.core.llm import LLMService
+
+    err_console = get_console(stderr=True)
+    # stdout carries the JSON lines; keep logs on stderr.
+    setup_logging(log_level, stderr=True)
+
+    def emit(record: dict) -> None:
+        print(json.dumps(record, default=str), flush=True)
+
+    try:
+        github_client = GitHubClient()
+        llm_service = LLMService()
+        git_repo = GitRepo(repo_path or os.getcwd())
+        queue = IssueQueue(queue_db or str(git_repo.state_dir() / "queue.sqlite3"))
+        repo_name = github_client.repo_name
+
+        entries = [(n, priority) for n in issue_numbers or []]
+        if label:
+            entries += [(n, priority) for n in github_client.list_open_issue_numbers(label)]
+        if from_file:
+            for line in from_file.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    item = json.loads(line)
+                    number = item.get("issue", item.get("number"))
+                    entries.append((int(number), int(item.get("priority", priority))))
+
+        skipped = [n for n, p in entries if not queue.enqueue(repo_name, n, p, force=force)]
+        if skipped:
+            err_console.print(
+                "[bold yellow]⚠[/bold yellow] Skipped issue(s) already done, queued or running: "
+                + ", ".join(f"#{n}" for n in skipped)
+                + ("" if force else " (--force re-runs finished ones)")
+            )
+        emit(
+            {
+                "event": "enqueued",
+                "count": len(entries) - len(skipped),
+                "skipped": skipped,
+                "queue": queue.stats(repo_name),
+            }
+        )
+
+        runner = BatchRunner(
+            queue,
+            repo_name,
+            agent_factory=lambda: CodeAgent(
+                github_client=github_client, llm_service=llm_service, repo_path=repo_path
+            ),
+            workers=workers,
+            max_per_repo=max_per_repo,
+            on_result=emit,
+        )
+        stats = runner.run()
+        emit({"event": "stats", **stats, "queue": queue.stats(repo_name)})
+        queue.close()
+
+        if stats["failed"]:
+            sys.exit(1)
+
+    except Exception as e:
+        err_console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.exception("Failed to process issues")
+        else:
+            logging.error("Failed to process issues: %s", e)
+        sys.exit(1)
+
+
 @app.command()
 def review_pr(
     pr_number: int = typer.Argument(..., help="Pull request number to review"),
     repo_path: str | None = typer.Option(
-        None, "--repo-path", "-r", help="Path to local repository (used for DEMO_MODE artifacts)"
-    ),
-    log_level: str = typer.Option(
-        settings.log_level, "--log-level", "-l", help="Logging level"
+        None, "--repo-path", "-r", help="Path to local repository (local PR diffs, DEMO_MODE artifacts)"
     ),
+    log_level: str | None = typer.Option(None, "--log-level", "-l", help=LOG_LEVEL_HELP),
+    trace_out: str | None = typer.Option(None, "--trace-out", help=TRACE_OUT_HELP),
 ) -> None:
     """Review a pull request and provide feedback."""
+    from code_agent.daemon import run
+
+    console = get_console()
     setup_logging(log_level)
 
     console.print(f"[bold blue]Reviewing PR #{pr_number}...[/bold blue]")
 
     try:
-        agent = ReviewerAgent(repo_path=repo_path)
-        result = agent.review_pull_request(pr_number)
+        result = run(
+            "review_pr", pr_number=pr_number, repo_path=repo_path, trace_out=trace_out
+        )
 
         if result.get("approved"):
             console.print("[bold green]✓[/bold green] PR Approved!")
@@ -135,18 +280,26 @@ def fix_pr(
     repo_path: str | None = typer.Option(
         None, "--repo-path", "-r", help="Path to local repository"
     ),
-    log_level: str = typer.Option(
-        settings.log_level, "--log-level", "-l", help="Logging level"
-    ),
+    log_level: str | None = typer.Option(None, "--log-level", "-l", help=LOG_LEVEL_HELP),
+    trace_out: str | None = typer.Option(None, "--trace-out", help=TRACE_OUT_HELP),
 ) -> None:
     """Fix issues in a pull request based on review feedback."""
+    from code_agent.daemon import run
+
+    console = get_console()
     setup_logging(log_level)
 
     console.print(f"[bold blue]Fixing PR #{pr_number} (iteration {iteration})...[/bold blue]")
 
     try:
-        agent = CodeAgent(repo_path=repo_path)
-        result = agent.fix_pr_issues(pr_number, feedback, iteration)
+        result = run(
+            "fix_pr",
+            pr_number=pr_number,
+            feedback=feedback,
+            iteration=iteration,
+            repo_path=repo_path,
+            trace_out=trace_out,
+        )
 
         if result.get("success"):
             console.print("[bold green]✓[/bold green] Successfully fixed PR!")
@@ -164,22 +317,82 @@ def fix_pr(
         sys.exit(1)
 
 
+@app.command()
+def auto_loop(
+    issue_number: int = typer.Argument(..., help="GitHub issue number to process"),
+    max_iterations: int | None = typer.Option(
+        None, "--max-iterations", "-n", help="Maximum review/fix iterations (default: MAX_ITERATIONS)"
+    ),
+    repo_path: str | None = typer.Option(
+        None, "--repo-path", "-r", help="Path to local repository"
+    ),
+    log_level: str | None = typer.Option(None, "--log-level", "-l", help=LOG_LEVEL_HELP),
+    trace_out: str | None = typer.Option(None, "--trace-out", help=TRACE_OUT_HELP),
+) -> None:
+    """Create a PR for an issue, then review and fix it until approved (one process)."""
+    from code_agent.daemon import run
+
+    console = get_console()
+    setup_logging(log_level)
+
+    console.print(f"[bold blue]Running auto loop for issue #{issue_number}...[/bold blue]")
+
+    try:
+        result = run(
+            "auto_loop",
+            issue_number=issue_number,
+            max_iterations=max_iterations,
+            repo_path=repo_path,
+            trace_out=trace_out,
+        )
+
+        if result.get("approved"):
+            console.print("[bold green]✓[/bold green] PR Approved!")
+        elif result.get("stop_reason") == "process_failed":
+            console.print(f"[bold red]✗[/bold red] Failed: {result.get('error')}")
+            sys.exit(1)
+        else:
+            console.print(
+                f"[bold yellow]⚠[/bold yellow] Stopped without approval ({result['stop_reason']})"
+            )
+        if result.get("pr_number") is not None:
+            console.print(f"  PR Number: #{result['pr_number']}")
+        console.print(f"  Fix Iterations: {result['iterations']}")
+
+        if not result.get("approved"):
+            console.print("\n[bold]Last Feedback:[/bold]")
+            console.print(result.get("feedback") or "No feedback provided")
+            sys.exit(1)
+
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.exception("Failed to run auto loop")
+        else:
+            logging.error("Failed to run auto loop: %s", e)
+        sys.exit(1)
+
+
 @app.command()
 def generate_summary(
     pr_number: int = typer.Argument(..., help="Pull request number"),
     repo_path: str | None = typer.Option(
-        None, "--repo-path", "-r", help="Path to local repository (used for DEMO_MODE artifacts)"
-    ),
-    log_level: str = typer.Option(
-        settings.log_level, "--log-level", "-l", help="Logging level"
+        None, "--repo-path", "-r", help="Path to local repository (local PR diffs, DEMO_MODE artifacts)"
     ),
+    log_level: str | None = typer.Option(None, "--log-level", "-l", help=LOG_LEVEL_HELP),
+    trace_out: str | None = typer.Option(None, "--trace-out", help=TRACE_OUT_HELP),
 ) -> None:
     """Generate a review summary for GitHub Actions."""
-    setup_logging(log_level)
+    from code_agent.daemon import run
+
+    console = get_console()
+    # stdout carries the summary; keep logs on stderr.
+    setup_logging(log_level, stderr=True)
 
     try:
-        agent = ReviewerAgent(repo_path=repo_path)
-        summary = agent.generate_review_summary(pr_number)
+        summary = run(
+            "generate_summary", pr_number=pr_number, repo_path=repo_path, trace_out=trace_out
+        )
 
         # Print summary to stdout (can be captured by GitHub Actions)
         print(summary)
@@ -193,6 +406,43 @@ def generate_summary(
         sys.exit(1)
 
 
+@app.command()
+def daemon(
+    socket_path: str | None = typer.Option(
+        None, "--socket", help="Unix socket path (default: CODE_AGENT_SOCKET or a per-user path)"
+    ),
+    stop: bool = typer.Option(False, "--stop", help="Stop the running daemon"),
+    log_level: str | None = typer.Option(None, "--log-level", "-l", help=LOG_LEVEL_HELP),
+) -> None:
+    """Keep clients and agents warm; with CODE_AGENT_DAEMON=1 other commands forward to it."""
+    from code_agent.daemon import AgentDaemon, DaemonUnavailable, call
+
+    console = get_console()
+    setup_logging(log_level)
+
+    if stop:
+        try:
+            call("shutdown", socket_path=socket_path)
+            console.print("[bold green]✓[/bold green] Daemon stopped")
+        except DaemonUnavailable:
+            console.print("[bold yellow]⚠[/bold yellow] No daemon is running")
+        return
+
+    try:
+        server = AgentDaemon(socket_path)
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        sys.exit(1)
+
+    console.print(f"[bold blue]Code Agent daemon listening on {server.socket_path}[/bold blue]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
 if __name__ == "__main__":
     app()
 
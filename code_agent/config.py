@@ -38,6 +38,13 @@ class Settings(BaseSettings):
     # Agent settings
     max_iterations: int = Field(5, description="Maximum number of fix iterations")
     agent_branch_prefix: str = Field("agent/", description="Prefix for agent branches")
+    checkout_free_commits: bool = Field(
+        False,
+        description=(
+            "Build agent commits directly in the object database (git plumbing) "
+            "instead of checking out the branch in the working tree."
+        ),
+    )
     demo_mode: bool = Field(
         False,
         description=(
@@ -46,12 +53,68 @@ class Settings(BaseSettings):
         ),
     )
 
+    # Local validation settings
+    enable_local_validation: bool = Field(
+        True, description="Validate generated changes locally before committing"
+    )
+    validation_checks: str = Field(
+        "ast,ruff,black,pytest", description="Comma-separated local checks to run"
+    )
+    validation_retries: int = Field(
+        1, description="Regeneration attempts for files that fail local validation"
+    )
+    validation_timeout: int = Field(300, description="Timeout in seconds per validation check")
+
+    # Retrieval settings
+    enable_file_ranking: bool = Field(
+        True, description="Rank repository files against the issue before LLM analysis"
+    )
+    retrieval_top_k: int = Field(20, description="Number of ranked files passed to the LLM")
+    chunked_generation_lines: int = Field(
+        600, description="Python files longer than this are generated chunk by chunk"
+    )
+    max_chunks_per_file: int = Field(6, description="Chunks regenerated per file in chunked mode")
+    chunk_max_lines: int = Field(200, description="Classes longer than this are split by method")
+    pipeline_workers: int = Field(
+        4, description="Threads for overlapping independent process_issue stages"
+    )
+
     # Logging
     log_level: str = Field("INFO", description="Logging level")
+    log_format: str = Field(
+        "auto", description="Log output: rich, json, or auto (JSON when not writing to a TTY)"
+    )
 
     # Review settings
     enable_code_review: bool = Field(True, description="Enable AI code review")
     enable_ci_analysis: bool = Field(True, description="Enable CI/CD analysis")
+    ci_log_digest: bool = Field(
+        True, description="Add error excerpts from failed CI job logs to the review"
+    )
+    ci_log_context_lines: int = Field(20, description="Log lines kept around each CI error")
+    ci_log_max_windows: int = Field(4, description="Error windows kept per failed CI job")
+    ci_digest_chars: int = Field(6000, description="Maximum size of the CI failure digest")
+    review_local_diff: bool = Field(
+        True,
+        description="Compute PR diffs with git in the local clone (when --repo-path is given)",
+    )
+    review_function_context: bool = Field(
+        False, description="Widen local review diff hunks to whole enclosing functions"
+    )
+    review_split_chars: int = Field(
+        12000,
+        description="Diffs longer than this are reviewed per file in parallel, then aggregated",
+    )
+    review_workers: int = Field(4, description="Concurrent LLM calls for split reviews")
+    review_incremental: bool = Field(
+        True, description="Review only the commits pushed since the agent's last review"
+    )
+    review_prereview: bool = Field(
+        True, description="Classify diffs statically to skip or shorten trivial LLM reviews"
+    )
+    prereview_small_lines: int = Field(
+        3, description="Code diffs with at most this many changed lines get a short review"
+    )
 
 
 # Global settings instance
@@ -0,0 +1,110 @@
+"""Stage checkpoints for resumable agent runs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Hidden marker recording the run fingerprint in an agent PR description.
+FINGERPRINT_MARKER = "<!-- code-agent-fingerprint: {} -->"
+_FINGERPRINT_RE = re.compile(r"<!-- code-agent-fingerprint: ([0-9a-f]{64}) -->")
+
+
+def run_fingerprint(issue: dict[str, Any], base_sha: str, prompt_version: int, model: str) -> str:
+    """Identify a run by everything that determines its output."""
+    payload = json.dumps(
+        [issue.get("title", ""), issue.get("body", ""), base_sha, prompt_version, model]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def find_fingerprint(text: str | None) -> str | None:
+    """Extract the run fingerprint marker from a PR description."""
+    match = _FINGERPRINT_RE.search(text or "")
+    return match.group(1) if match else None
+
+
+# Hidden marker recording what a posted review covered (head SHA and findings).
+_REVIEW_STATE_RE = re.compile(r"<!-- code-agent-review: (\{.*?\}) -->", re.DOTALL)
+
+
+def review_state_marker(state: dict[str, Any]) -> str:
+    """Encode review state as an HTML comment that is safe inside Markdown."""
+    # ">" only occurs inside JSON strings, so escaping it keeps the JSON valid.
+    payload = json.dumps(state, separators=(",", ":")).replace(">", "\\u003e")
+    return f"<!-- code-agent-review: {payload} -->"
+
+
+def find_review_state(texts: list[str]) -> dict[str, Any] | None:
+    """Latest review state marker among ``texts`` (oldest first), if any."""
+    for text in reversed(texts):
+        for match in reversed(list(_REVIEW_STATE_RE.finditer(text or ""))):
+            try:
+                state = json.loads(match.group(1))
+            except ValueError:
+                continue
+            if isinstance(state, dict) and state.get("head"):
+                return state
+    return None
+
+
+class RunCheckpoint:
+    """Persist the JSON output of each pipeline stage under a run directory.
+
+    A re-run with the same run directory returns stored outputs instead of executing
+    completed stages again, so it resumes from the first incomplete stage.
+    """
+
+    def __init__(self, run_dir: Path) -> None:
+        """Initialize checkpoint store."""
+        self.run_dir = run_dir
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, stage: str) -> Path:
+        return self.run_dir / f"{stage}.json"
+
+    def is_done(self, stage: str) -> bool:
+        """Check whether a stage output has been stored."""
+        return self._path(stage).exists()
+
+    def load(self, stage: str) -> Any:
+        """Load a stage output (None if the stage has not completed)."""
+        try:
+            return json.loads(self._path(stage).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning("Ignoring corrupt checkpoint %s: %s", self._path(stage), e)
+            return None
+
+    def save(self, stage: str, output: Any) -> None:
+        """Store a stage output atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.run_dir, prefix=f".{stage}.")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2, default=str)
+        os.replace(tmp_path, self._path(stage))
+
+    def invalidate(self, *stages: str) -> None:
+        """Forget stored outputs so the stages run again."""
+        for stage in stages:
+            self._path(stage).unlink(missing_ok=True)
+
+    def run(self, stage: str, fn: Callable[[], Any]) -> Any:
+        """Return the stored output of ``stage``, or run ``fn`` and store its output."""
+        output = self.load(stage)
+        if output is not None:
+            logger.info(f"Resuming: '{stage}' loaded from checkpoint")
+            return output
+
+        output = fn()
+        self.save(stage, output)
+        return output
@@ -0,0 +1,191 @@
+"""Split large Python modules into definition-level chunks for bounded LLM calls."""
+
+from __future__ import annotations
+
+import ast
+import math
+from collections import Counter
+from dataclasses import dataclass
+
+from code_agent.core.retrieval import PATH_TOKEN_WEIGHT, tokenize
+
+# Lines of a module-level code chunk shown verbatim in the skeleton.
+SKELETON_CODE_LINES = 12
+
+# Hard cap on the skeleton so the context stays bounded for very large files.
+MAX_SKELETON_CHARS = 12000
+
+
+@dataclass
+class Chunk:
+    """A contiguous 1-based inclusive line range of a module."""
+
+    name: str
+    kind: str  # "code", "function" or "class"
+    start: int
+    end: int
+    signature: str = ""
+
+
+def split_chunks(source: str, max_lines: int = 200) -> list[Chunk]:
+    """Split a module into chunks that together cover every line.
+
+    Each top-level function/class is its own chunk (decorators included) and runs of
+    other top-level statements are grouped. Classes longer than ``max_lines`` are split
+    into their header and one chunk per method. Blank lines and comments between
+    statements belong to the following chunk. Raises ``SyntaxError`` for invalid code.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    chunks = _split_body(tree.body, lines, 1, max_lines, prefix="")
+    if chunks:
+        chunks[-1].end = len(lines)
+    return chunks
+
+
+def _split_body(
+    body: list[ast.stmt], lines: list[str], first_line: int, max_lines: int, prefix: str
+) -> list[Chunk]:
+    chunks: list[Chunk] = []
+    start = first_line
+    for node in body:
+        end = node.end_lineno or node.lineno
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef):
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            def_line = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            name = prefix + node.name
+            members = node.body[1:] if ast.get_docstring(node) is not None else node.body
+            if kind == "class" and end - def_line + 1 > max_lines and members:
+                # The header keeps the class line, decorators and docstring.
+                header_end = members[0].lineno - 1
+                chunks.append(
+                    Chunk(name, "class", start, header_end, _signature(lines, node.lineno))
+                )
+                chunks.extend(
+                    _split_body(members, lines, header_end + 1, max_lines, prefix=f"{name}.")
+                )
+            else:
+                chunks.append(Chunk(name, kind, start, end, _signature(lines, node.lineno)))
+        elif chunks and chunks[-1].kind == "code":
+            chunks[-1].end = end
+        else:
+            chunks.append(
+                Chunk(f"{prefix}<body>" if prefix else "<module code>", "code", start, end)
+            )
+        start = end + 1
+    return chunks
+
+
+def _signature(lines: list[str], def_line: int) -> str:
+    """The ``def``/``class`` line(s) of a definition, up to the colon."""
+    signature = []
+    for line in lines[def_line - 1 :]:
+        signature.append(line)
+        if line.rstrip().endswith(":"):
+            break
+    return "\n".join(signature)
+
+
+def chunk_text(source: str, chunk: Chunk) -> str:
+    """Source lines of one chunk (line endings preserved)."""
+    return "".join(source.splitlines(keepends=True)[chunk.start - 1 : chunk.end])
+
+
+def select_chunks(source: str, chunks: list[Chunk], query: str, limit: int) -> list[Chunk]:
+    """Pick up to ``limit`` chunks most relevant to ``query`` (lexical, idf-weighted).
+
+    Definition names count ``PATH_TOKEN_WEIGHT`` times, like file paths in retrieval.
+    Chunks with no query term in common are never selected.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    counts = []
+    for chunk in chunks:
+        counter = Counter(tokenize(chunk_text(source, chunk)))
+        for term in tokenize(chunk.name):
+            counter[term] += PATH_TOKEN_WEIGHT
+        counts.append(counter)
+
+    df = Counter(term for counter in counts for term in terms & counter.keys())
+    scored = []
+    for chunk, counter in zip(chunks, counts, strict=True):
+        score = 0.0
+        for term in terms & counter.keys():
+            score += math.log(1 + len(chunks) / df[term]) * (1 + math.log(counter[term]))
+        if score > 0:
+            scored.append((score, chunk))
+
+    scored.sort(key=lambda item: -item[0])
+    return sorted((chunk for _, chunk in scored[:limit]), key=lambda c: c.start)
+
+
+def build_skeleton(source: str, chunks: list[Chunk], selected: list[Chunk]) -> str:
+    """Outline of the module: signatures of other definitions, selected chunks marked."""
+    lines = source.splitlines()
+    selected_starts = {chunk.start for chunk in selected}
+    parts = []
+    for chunk in chunks:
+        header = f"# lines {chunk.start}-{chunk.end}"
+        if chunk.start in selected_starts:
+            parts.append(f"{header}: {chunk.name} (being edited)")
+        elif chunk.kind == "code":
+            body = [line for line in lines[chunk.start - 1 : chunk.end] if line.strip()]
+            if len(body) > SKELETON_CODE_LINES:
+                body = body[:SKELETON_CODE_LINES] + ["# ..."]
+            parts.append("\n".join([header, *body]))
+        else:
+            indent = chunk.signature[: len(chunk.signature) - len(chunk.signature.lstrip())]
+            parts.append(f"{header}\n{chunk.signature}\n{indent}    ...")
+
+    skeleton = "\n".join(parts)
+    if len(skeleton) > MAX_SKELETON_CHARS:
+        skeleton = skeleton[:MAX_SKELETON_CHARS] + "\n# ... (outline truncated)"
+    return skeleton
+
+
+def hoist_imports(source: str, replacement: str) -> tuple[str, list[str]]:
+    """Split leading import lines off the replacement of a top-level definition.
+
+    Returns the replacement without them and the imports not already in ``source``.
+    Not for the ``<module code>`` chunk: its imports are the ones "already present".
+    """
+    lines = replacement.splitlines(keepends=True)
+    existing = {line.strip() for line in source.splitlines()}
+    imports: list[str] = []
+    index = 0
+    while index < len(lines):
+        stripped = lines[index].strip()
+        if stripped.startswith(("import ", "from ")) and not lines[index][:1].isspace():
+            if stripped not in existing and stripped not in imports:
+                imports.append(stripped)
+        elif stripped:
+            break
+        index += 1
+    return "".join(lines[index:]), imports
+
+
+def insert_imports(source: str, imports: list[str]) -> str:
+    """Insert import lines after the module's last top-level import (or docstring)."""
+    if not imports:
+        return source
+
+    tree = ast.parse(source)
+    anchor = 0
+    for node in tree.body:
+        if isinstance(node, ast.Import | ast.ImportFrom):
+            anchor = node.end_lineno or node.lineno
+        elif (
+            anchor == 0
+            and isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)
+        ):
+            anchor = node.end_lineno or node.lineno
+        else:
+            break
+
+    lines = source.splitlines(keepends=True)
+    new_lines = [f"{line}\n" for line in imports]
+    return "".join(lines[:anchor] + new_lines + lines[anchor:])
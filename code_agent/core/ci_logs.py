@@ -0,0 +1,91 @@
+"""Extract the interesting parts of (possibly huge) CI job logs while streaming them."""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from collections.abc import Iterable
+
+# Lines that usually start or belong to an error report (pytest, mypy, ruff, Actions).
+ERROR_RE = re.compile(
+    r"##\[error\]|Traceback \(most recent call last\)|^E\s{2,}|\bFAILED\b|\bERROR\b"
+    r"|\b\w*Error:|: error:|\berror\[|Process completed with exit code [1-9]"
+)
+
+# GitHub Actions prefixes every log line with an ISO timestamp.
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z ")
+
+# Failed jobs whose logs are fetched per review.
+MAX_LOG_JOBS = 3
+
+MAX_LINE_CHARS = 300
+
+
+def extract_failure_windows(
+    lines: Iterable[str], context: int = 20, max_windows: int = 4
+) -> list[list[str]]:
+    """Collect windows of ``context`` lines around error markers in one pass.
+
+    Memory stays bounded by a ring buffer of the preceding lines and at most
+    ``max_windows`` windows: the first one (usually the root cause) and the last ones
+    (usually the tool's summary). Markers inside an open window extend it.
+    """
+    before: deque[str] = deque(maxlen=context)
+    first: list[str] | None = None
+    latest: deque[list[str]] = deque(maxlen=max(0, max_windows - 1))
+    window: list[str] | None = None
+    remaining = 0
+
+    def close(window: list[str]) -> None:
+        nonlocal first
+        if first is None:
+            first = window
+        elif latest.maxlen:
+            latest.append(window)
+
+    for raw in lines:
+        line = _TIMESTAMP_RE.sub("", raw.rstrip("\r\n"))
+        if len(line) > MAX_LINE_CHARS:
+            line = line[:MAX_LINE_CHARS] + " ..."
+        is_error = bool(ERROR_RE.search(line))
+
+        if window is not None:
+            window.append(line)
+            remaining = context if is_error else remaining - 1
+            # Error floods (thousands of "E " lines) are cut into several windows.
+            if remaining <= 0 or len(window) >= 4 * context + 1:
+                close(window)
+                window = None
+                before.clear()
+            continue
+
+        if is_error:
+            window = [*before, line]
+            remaining = context
+        else:
+            before.append(line)
+
+    if window is not None:
+        close(window)
+    return ([first] if first is not None else []) + list(latest)
+
+
+def failure_digest(failures: list[tuple[str, list[list[str]]]], max_chars: int = 6000) -> str:
+    """Format the windows of failed checks as a compact digest for the reviewer."""
+    if not failures:
+        return ""
+
+    parts = ["Failure excerpts from CI logs:"]
+    for name, windows in failures:
+        parts.append(f"\n### {name}")
+        if not windows:
+            parts.append("(no error markers found in the log)")
+        for index, window in enumerate(windows):
+            if index:
+                parts.append("[...]")
+            parts.append("\n".join(window))
+
+    digest = "\n".join(parts)
+    if len(digest) > max_chars:
+        digest = digest[:max_chars] + "\n[digest truncated]"
+    return digest
@@ -0,0 +1,179 @@
+"""Import graph of a repository's Python modules for affected-test selection."""
+
+from __future__ import annotations
+
+import ast
+import json
+import logging
+import os
+from collections import deque
+from typing import TYPE_CHECKING, Any
+
+from code_agent.core.validation import is_test_file
+
+if TYPE_CHECKING:
+    from code_agent.core.github_client import GitRepo
+
+logger = logging.getLogger(__name__)
+
+# Bump when import extraction changes so stale caches are ignored.
+GRAPH_VERSION = 1
+
+# Number of per-commit graph caches kept on disk.
+MAX_CACHED_COMMITS = 5
+
+
+def extract_imports(source: str, module: str, is_package: bool = False) -> list[str]:
+    """Absolute names of the modules imported by ``source``.
+
+    ``from pkg import name`` yields both ``pkg.name`` and ``pkg``, since ``name`` may be a
+    submodule; relative imports are resolved against ``module``.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+
+    package_parts = module.split(".") if is_package else module.split(".")[:-1]
+    names: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package_parts[: len(package_parts) - node.level + 1]
+                base = ".".join(base_parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            if base:
+                names.add(base)
+            names.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names)
+    return sorted(names)
+
+
+def module_name(path: str) -> tuple[str, bool]:
+    """Dotted module name of a ``.py`` path and whether it is a package ``__init__``."""
+    parts = path[:-3].split("/")
+    is_package = parts[-1] == "__init__"
+    if is_package:
+        parts = parts[:-1]
+    if parts and parts[0] == "src":
+        # src-layout: the import root is src/
+        parts = parts[1:]
+    return ".".join(parts), is_package
+
+
+class ImportGraph:
+    """Reverse import graph over the Python files of a commit.
+
+    Parsed imports are cached per commit on disk and reused per blob SHA, so building
+    the graph for a new commit only re-parses the files that changed.
+    """
+
+    def __init__(self, git_repo: GitRepo) -> None:
+        """Initialize import graph."""
+        self.git_repo = git_repo
+        self._graphs: dict[str, dict[str, Any]] = {}
+
+    def affected_tests(self, changed_files: list[str], ref: str = "HEAD") -> list[str]:
+        """Test modules that transitively import any of ``changed_files``.
+
+        Changed test files are always included; a changed ``conftest.py`` selects every
+        test module below its directory.
+        """
+        graph = self.get_graph(ref)
+        files: dict[str, Any] = graph["files"]
+        modules = {module_name(path)[0]: path for path in files}
+
+        dependents: dict[str, set[str]] = {}
+        for path, info in files.items():
+            for imported in info["imports"]:
+                target = self._resolve(imported, modules)
+                if target and target != path:
+                    dependents.setdefault(target, set()).add(path)
+
+        seen = set(changed_files)
+        queue = deque(changed_files)
+        while queue:
+            for dependent in dependents.get(queue.popleft(), ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    queue.append(dependent)
+
+        tests = {path for path in seen if is_test_file(path)}
+        for path in seen:
+            if os.path.basename(path) == "conftest.py":
+                prefix = os.path.dirname(path)
+                tests.update(
+                    p
+                    for p in files
+                    if is_test_file(p) and (not prefix or p.startswith(prefix + "/"))
+                )
+        return sorted(tests)
+
+    @staticmethod
+    def _resolve(imported: str, modules: dict[str, str]) -> str | None:
+        """Map an imported name to a repository file (longest matching module)."""
+        parts = imported.split(".")
+        while parts:
+            path = modules.get(".".join(parts))
+            if path:
+                return path
+            parts.pop()
+        return None
+
+    def get_graph(self, ref: str = "HEAD") -> dict[str, Any]:
+        """Load or (incrementally) build the import graph for ``ref``."""
+        sha = self.git_repo.head_sha(ref)
+        if sha in self._graphs:
+            return self._graphs[sha]
+
+        cache_dir = self.git_repo.state_dir("import_graph")
+        cache_path = cache_dir / f"{sha}.json"
+        graph = self._load(cache_path)
+        if graph is None:
+            previous = self._latest_cached(cache_dir)
+            graph = self._build(sha, previous["files"] if previous else {})
+            cache_path.write_text(json.dumps(graph), encoding="utf-8")
+            for stale in sorted(cache_dir.glob("*.json"), key=os.path.getmtime)[
+                :-MAX_CACHED_COMMITS
+            ]:
+                stale.unlink(missing_ok=True)
+
+        self._graphs[sha] = graph
+        return graph
+
+    def _load(self, path: Any) -> dict[str, Any] | None:
+        try:
+            graph = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return graph if graph.get("version") == GRAPH_VERSION else None
+
+    def _latest_cached(self, cache_dir: Any) -> dict[str, Any] | None:
+        candidates = sorted(cache_dir.glob("*.json"), key=os.path.getmtime, reverse=True)
+        return self._load(candidates[0]) if candidates else None
+
+    def _build(self, sha: str, previous: dict[str, Any]) -> dict[str, Any]:
+        """Collect imports for every Python blob, reusing entries with the same blob SHA."""
+        files: dict[str, Any] = {}
+        parsed = 0
+        for item in self.git_repo.repo.commit(sha).tree.traverse():
+            if item.type != "blob" or not item.path.endswith(".py"):
+                continue
+
+            cached = previous.get(item.path)
+            if cached and cached["blob"] == item.hexsha:
+                files[item.path] = cached
+                continue
+
+            module, is_package = module_name(item.path)
+            source = item.data_stream.read().decode("utf-8", errors="replace")
+            files[item.path] = {
+                "blob": item.hexsha,
+                "imports": extract_imports(source, module, is_package),
+            }
+            parsed += 1
+
+        logger.info(f"Import graph for {sha[:12]}: {len(files)} modules ({parsed} parsed)")
+        return {"version": GRAPH_VERSION, "commit": sha, "files": files}
@@ -0,0 +1,198 @@
+"""Persistent priority queue of issues for batch processing (SQLite)."""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo TEXT NOT NULL,
+    issue_number INTEGER NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat_at REAL,
+    UNIQUE (repo, issue_number)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (repo, status, priority DESC, id);
+"""
+
+# Columns added after the first release, for databases created before them.
+_MIGRATIONS = {"owner": "TEXT", "heartbeat_at": "REAL"}
+
+# A running job whose owner sent no heartbeat for this long is considered abandoned.
+STALE_AFTER = 300.0
+
+
+def process_owner() -> str:
+    """Identify this process as ``host:pid`` for job ownership."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: str | None, now: float, heartbeat_at: float | None) -> bool:
+    """Whether the process that claimed a job may still be working on it."""
+    if not owner or heartbeat_at is None or now - heartbeat_at > STALE_AFTER:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        # Another machine: only its heartbeat tells.
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+@dataclass
+class QueuedIssue:
+    """An issue claimed from the queue."""
+
+    job_id: int
+    repo: str
+    issue_number: int
+    priority: int
+    attempts: int
+
+
+class IssueQueue:
+    """SQLite-backed queue; higher priority first, then FIFO.
+
+    Jobs survive process restarts: finished issues are not re-run when enqueued again
+    (unless forced), failed ones are reset to pending, and jobs left ``running`` by a
+    crashed process can be requeued with ``requeue_stale``. Running jobs record their
+    owner (``host:pid``) and a heartbeat, so a second runner on the same database
+    never takes over jobs that are still being processed.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        """Open (or create) the queue database."""
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in _MIGRATIONS.items():
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def enqueue(self, repo: str, issue_number: int, priority: int = 0, force: bool = False) -> bool:
+        """Add an issue; returns False if it is already done, queued or running.
+
+        ``force`` requeues a finished issue as well (e.g. after the issue was edited).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, priority FROM jobs WHERE repo = ? AND issue_number = ?",
+                (repo, issue_number),
+            ).fetchone()
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO jobs (repo, issue_number, priority, enqueued_at) VALUES (?, ?, ?, ?)",
+                    (repo, issue_number, priority, time.time()),
+                )
+                return True
+
+            status, current_priority = row
+            if status == "failed" or (force and status == "done"):
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'pending', priority = ?, enqueued_at = ? "
+                    "WHERE repo = ? AND issue_number = ?",
+                    (priority, time.time(), repo, issue_number),
+                )
+                return True
+            if status == "pending" and priority > current_priority:
+                self._conn.execute(
+                    "UPDATE jobs SET priority = ? WHERE repo = ? AND issue_number = ?",
+                    (priority, repo, issue_number),
+                )
+            return False
+
+    def claim(self, repo: str, owner: str | None = None) -> QueuedIssue | None:
+        """Atomically take the next pending issue for ``repo`` and mark it running.
+
+        ``owner`` defaults to this process (see ``process_owner``).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, repo, issue_number, priority, attempts FROM jobs "
+                "WHERE repo = ? AND status = 'pending' ORDER BY priority DESC, id LIMIT 1",
+                (repo,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, "
+                "owner = ?, heartbeat_at = ? WHERE id = ?",
+                (now, owner or process_owner(), now, row[0]),
+            )
+            return QueuedIssue(row[0], row[1], row[2], row[3], row[4] + 1)
+
+    def complete(self, job_id: int, success: bool, result: dict[str, Any]) -> None:
+        """Record the outcome of a claimed issue."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+                (
+                    "done" if success else "failed",
+                    json.dumps(result, default=str),
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def heartbeat(self, owner: str | None = None) -> None:
+        """Mark the running jobs of ``owner`` (default: this process) as alive."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?",
+                (time.time(), owner or process_owner()),
+            )
+
+    def requeue_stale(self, repo: str) -> int:
+        """Reset running jobs whose owner is gone or silent back to pending.
+
+        An owner is gone when it ran on this host and its process no longer exists, or
+        when it sent no heartbeat for ``STALE_AFTER`` seconds.
+        """
+        with self._lock:
+            now = time.time()
+            rows = self._conn.execute(
+                "SELECT id, owner, heartbeat_at FROM jobs WHERE repo = ? AND status = 'running'",
+                (repo,),
+            ).fetchall()
+            stale = [
+                (job_id,) for job_id, owner, beat in rows if not _owner_alive(owner, now, beat)
+            ]
+            self._conn.executemany("UPDATE jobs SET status = 'pending' WHERE id = ?", stale)
+            return len(stale)
+
+    def stats(self, repo: str) -> dict[str, int]:
+        """Count jobs per status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE repo = ? GROUP BY status", (repo,)
+            ).fetchall()
+        return dict(rows)
@@ -1,5 +1,6 @@
 """LLM integration for Code Agent."""
 
+import json
 import logging
 from abc import ABC, abstractmethod
 from typing import Any
@@ -8,9 +9,36 @@ import httpx
 from openai import OpenAI
 
 from code_agent.config import settings
+from code_agent.core.plan import parse_plan, plan_schema
+from code_agent.core.review_split import PieceReview, ReviewResult
+from code_agent.utils import tracing
+from code_agent.utils.llm_json import parse_json_model
 
 logger = logging.getLogger(__name__)
 
+# Bump when prompts change in a way that should invalidate earlier runs' results.
+PROMPT_VERSION = 1
+
+
+def _record_generation(
+    model: str,
+    messages: list[dict[str, str]],
+    text: str,
+    prompt_tokens: int | str | None = None,
+    completion_tokens: int | str | None = None,
+) -> None:
+    """Attach sizes and token usage of one completion to the current span."""
+    if not tracing.active():
+        return
+    span = tracing.current_span()
+    span.set_attribute("llm.model", model)
+    span.set_attribute("llm.prompt_chars", sum(len(m.get("content") or "") for m in messages))
+    span.set_attribute("llm.response_chars", len(text))
+    if prompt_tokens is not None:
+        span.set_attribute("llm.prompt_tokens", int(prompt_tokens))
+    if completion_tokens is not None:
+        span.set_attribute("llm.completion_tokens", int(completion_tokens))
+
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
@@ -21,8 +49,13 @@ class LLMProvider(ABC):
         messages: list[dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int | None = None,
+        response_format: dict[str, Any] | None = None,
     ) -> str:
-        """Generate text from messages."""
+        """Generate text from messages.
+
+        ``response_format`` (e.g. ``{"type": "json_object"}``) requests structured output
+        from providers that support it; others ignore it.
+        """
         pass
 
 
@@ -48,20 +81,33 @@ class OpenAIProvider(LLMProvider):
         )
         self.model = settings.openai_model
 
+    @tracing.traced("llm.generate", **{"llm.provider": "openai"})
     def generate(
         self,
         messages: list[dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int | None = None,
+        response_format: dict[str, Any] | None = None,
     ) -> str:
         """Generate text using OpenAI API."""
+        extra: dict[str, Any] = {"response_format": response_format} if response_format else {}
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,  # type: ignore
             temperature=temperature,
             max_tokens=max_tokens,
+            **extra,
         )
-        return response.choices[0].message.content or ""
+        text = response.choices[0].message.content or ""
+        usage = getattr(response, "usage", None)
+        _record_generation(
+            self.model,
+            messages,
+            text,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+        return text
 
 
 class OpenRouterProvider(LLMProvider):
@@ -90,19 +136,32 @@ class OpenRouterProvider(LLMProvider):
         self.model = settings.openrouter_model
         logger.info("OpenRouter configured (base_url=%s, model=%s)", base_url, self.model)
 
+    @tracing.traced("llm.generate", **{"llm.provider": "openrouter"})
     def generate(
         self,
         messages: list[dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int | None = None,
+        response_format: dict[str, Any] | None = None,
     ) -> str:
+        extra: dict[str, Any] = {"response_format": response_format} if response_format else {}
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,  # type: ignore
             temperature=temperature,
             max_tokens=max_tokens,
+            **extra,
+        )
+        text = response.choices[0].message.content or ""
+        usage = getattr(response, "usage", None)
+        _record_generation(
+            self.model,
+            messages,
+            text,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
         )
-        return response.choices[0].message.content or ""
+        return text
 
 
 class YandexGPTProvider(LLMProvider):
@@ -114,13 +173,15 @@ class YandexGPTProvider(LLMProvider):
         self.folder_id = settings.yandex_folder_id
         self.base_url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
 
+    @tracing.traced("llm.generate", **{"llm.provider": "yandex"})
     def generate(
         self,
         messages: list[dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int | None = None,
+        response_format: dict[str, Any] | None = None,
     ) -> str:
-        """Generate text using Yandex GPT API."""
+        """Generate text using Yandex GPT API (``response_format`` is not supported)."""
         headers = {
             "Authorization": f"Api-Key {self.api_key}",
             "Content-Type": "application/json",
@@ -139,7 +200,36 @@ class YandexGPTProvider(LLMProvider):
             response = client.post(self.base_url, headers=headers, json=payload, timeout=60)
             response.raise_for_status()
             result = response.json()
-            return result["result"]["alternatives"][0]["message"]["text"]
+            text = result["result"]["alternatives"][0]["message"]["text"]
+            usage = result["result"].get("usage") or {}
+            _record_generation(
+                "yandexgpt-lite",
+                messages,
+                text,
+                usage.get("inputTextTokens"),
+                usage.get("completionTokens"),
+            )
+            return text
+
+
+def _previous_review_context(previous_review: dict[str, Any] | None) -> str:
+    """Prompt section telling the reviewer the diff is incremental."""
+    if not previous_review:
+        return ""
+
+    issues = previous_review.get("issues") or []
+    outstanding = "\n".join(f"- {issue}" for issue in issues) or "(none listed)"
+    context = (
+        f"\n\nThis is a follow-up review. The diff above contains ONLY the commits pushed "
+        f"since the previous review of commit {previous_review['head'][:12]}.\n"
+        f"Outstanding issues from the previous review:\n{outstanding}\n"
+    )
+    if previous_review.get("feedback"):
+        context += f"Previous feedback:\n{previous_review['feedback']}\n"
+    return context + (
+        "Keep previous issues that these changes do not address, drop the ones they "
+        "fix, and add any new problems the changes introduce."
+    )
 
 
 def get_llm_provider() -> LLMProvider:
@@ -158,10 +248,26 @@ class LLMService:
         """Initialize LLM service."""
         self.provider = provider or get_llm_provider()
 
+    @property
+    def model_id(self) -> str:
+        """Provider and model name, e.g. ``OpenAIProvider:gpt-4o-mini``."""
+        model = getattr(self.provider, "model", None) or settings.llm_provider
+        return f"{type(self.provider).__name__}:{model}"
+
     def generate_code_changes(
-        self, issue_description: str, current_code: str, file_path: str
+        self,
+        issue_description: str,
+        current_code: str,
+        file_path: str,
+        related_files: list[str] | None = None,
     ) -> str:
         """Generate code changes based on issue description."""
+        related_context = ""
+        if related_files:
+            others = [f for f in related_files if f != file_path]
+            if others:
+                related_context = "Other relevant files in the repository:\n" + "\n".join(others) + "\n\n"
+
         messages = [
             {
                 "role": "system",
@@ -177,6 +283,7 @@ class LLMService:
                 "content": (
                     f"Issue Description:\n{issue_description}\n\n"
                     f"File: {file_path}\n\n"
+                    f"{related_context}"
                     f"Current Code:\n{current_code}\n\n"
                     f"Please provide the updated code that solves this issue."
                 ),
@@ -197,15 +304,116 @@ class LLMService:
             # Otherwise, keep the original file unchanged.
             return current_code
 
-    def analyze_issue(self, issue_description: str, repo_structure: str) -> dict[str, Any]:
-        """Analyze issue and determine what files need to be changed."""
+    def generate_chunk_changes(
+        self,
+        issue_description: str,
+        file_path: str,
+        skeleton: str,
+        chunk: str,
+        start_line: int,
+        end_line: int,
+    ) -> str:
+        """Rewrite one chunk of a large file for the issue, given an outline of the rest.
+
+        Returns the chunk unchanged if the LLM is unavailable.
+        """
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are an expert software developer. The file is too large to edit "
+                    "at once, so you are given an outline of it and one chunk to update "
+                    "for the issue. Return ONLY the complete updated chunk (same "
+                    "indentation), without explanations. If the chunk needs no change, "
+                    "return it unchanged. If it needs new imports, put them as the very "
+                    "first lines of your reply; they will be moved to the module imports."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Issue Description:\n{issue_description}\n\n"
+                    f"File: {file_path}\n\n"
+                    f"Outline of the file:\n{skeleton}\n\n"
+                    f"Chunk to update (lines {start_line}-{end_line}):\n{chunk}\n\n"
+                    "Please provide the updated chunk."
+                ),
+            },
+        ]
+        try:
+            return self.provider.generate(messages, temperature=0.3)
+        except Exception as e:
+            logger.warning("LLM unavailable for generate_chunk_changes (%s): %s", type(e).__name__, e)
+            return chunk
+
+    def fix_code_region(
+        self,
+        issue_description: str,
+        file_path: str,
+        region: str,
+        start_line: int,
+        end_line: int,
+        feedback: str,
+        context_before: str = "",
+        context_after: str = "",
+    ) -> str:
+        """Rewrite one region of a file to address review feedback.
+
+        Only the region is returned; surrounding lines are given for context only.
+        """
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are an expert software developer. Fix the given code region "
+                    "based on the review feedback. Return ONLY the replacement for the "
+                    "region (same indentation), without the surrounding context and "
+                    "without explanations."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Original Issue:\n{issue_description}\n\n"
+                    f"File: {file_path}\n\n"
+                    f"Context before (do not repeat):\n{context_before}\n\n"
+                    f"Region to fix (lines {start_line}-{end_line}):\n{region}\n\n"
+                    f"Context after (do not repeat):\n{context_after}\n\n"
+                    f"Review Feedback:\n{feedback}\n\n"
+                    "Please provide the fixed region."
+                ),
+            },
+        ]
+        return self.provider.generate(messages, temperature=0.3)
+
+    def analyze_issue(
+        self,
+        issue_description: str,
+        repo_structure: str,
+        relevant_files: list[str] | None = None,
+    ) -> dict[str, Any]:
+        """Analyze issue and determine what files need to be changed.
+
+        ``files_to_modify`` holds the planned ``{"path", "action", "rationale"}`` entries;
+        it is empty when the response could not be parsed as a ``ChangePlan``.
+        """
+        relevant_context = ""
+        if relevant_files:
+            relevant_context = (
+                "Most relevant files (ranked by lexical match with the issue):\n"
+                + "\n".join(relevant_files)
+                + "\n\n"
+            )
+
         messages = [
             {
                 "role": "system",
                 "content": (
                     "You are an expert software architect. Analyze the issue and "
-                    "determine which files need to be created or modified. "
-                    "Respond in a structured format with file paths and actions."
+                    "determine which files need to be created, modified or deleted. "
+                    "Only list files that must change; use paths exactly as they appear "
+                    "in the repository structure. Respond with a single JSON object "
+                    f"matching this JSON schema:\n{plan_schema()}"
                 ),
             },
             {
@@ -213,23 +421,47 @@ class LLMService:
                 "content": (
                     f"Issue Description:\n{issue_description}\n\n"
                     f"Repository Structure:\n{repo_structure}\n\n"
-                    "Please analyze what needs to be done and which files to modify."
+                    f"{relevant_context}"
+                    "Please analyze what needs to be done and which files to change."
                 ),
             },
         ]
         try:
-            response = self.provider.generate(messages, temperature=0.5)
+            response = self.provider.generate(
+                messages, temperature=0.5, response_format={"type": "json_object"}
+            )
         except Exception as e:
             logger.warning("LLM unavailable for analyze_issue (%s): %s", type(e).__name__, e)
-            response = "LLM unavailable; using heuristic file inference."
-        # Parse response and return structured data
-        return {"analysis": response, "files_to_modify": []}
+            return {
+                "analysis": "LLM unavailable; using heuristic file inference.",
+                "files_to_modify": [],
+                "fallback": True,
+            }
+
+        try:
+            plan = parse_plan(response)
+        except ValueError as e:
+            logger.warning("analyze_issue returned no valid plan: %s", e)
+            return {"analysis": response, "files_to_modify": []}
+
+        return {
+            "analysis": plan.summary,
+            "files_to_modify": [action.model_dump() for action in plan.files],
+        }
 
     def review_code_changes(
-        self, diff: str, issue_description: str, ci_results: str | None = None
+        self,
+        diff: str,
+        issue_description: str,
+        ci_results: str | None = None,
+        previous_review: dict[str, Any] | None = None,
     ) -> dict[str, Any]:
-        """Review code changes and provide feedback."""
+        """Review code changes and provide feedback.
+
+        With ``previous_review`` the diff holds only the commits pushed since that review.
+        """
         ci_context = f"\n\nCI/CD Results:\n{ci_results}" if ci_results else ""
+        ci_context += _previous_review_context(previous_review)
 
         messages = [
             {
@@ -278,3 +510,136 @@ class LLMService:
             "issues": [],
         }
 
+    def quick_review(
+        self,
+        diff: str,
+        issue_description: str,
+        ci_results: str | None = None,
+        previous_review: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Short review of a trivial diff (docs-only or a few changed lines)."""
+        ci_context = f"\n\nCI/CD Results:\n{ci_results}" if ci_results else ""
+        ci_context += _previous_review_context(previous_review)
+
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You review small pull request changes. Approve unless the change is "
+                    "wrong, unrelated to the issue, or breaks something. Be brief. Return a "
+                    "JSON object with: approved (bool), feedback (str), issues (list of "
+                    "strings)."
+                ),
+            },
+            {
+                "role": "user",
+                "content": f"Issue:\n{issue_description}\n\nDiff:\n{diff}{ci_context}",
+            },
+        ]
+        try:
+            response = self.provider.generate(
+                messages,
+                temperature=0.2,
+                max_tokens=400,
+                response_format={"type": "json_object"},
+            )
+            return parse_json_model(response, ReviewResult).model_dump()
+        except Exception as e:
+            logger.warning("Quick review failed (%s): %s", type(e).__name__, e)
+            return self.review_code_changes(
+                diff, issue_description, ci_results, previous_review=previous_review
+            )
+
+    def review_diff_piece(
+        self, diff: str, label: str, issue_description: str
+    ) -> dict[str, Any]:
+        """Review one part of a PR diff (the map step of a split review)."""
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are an expert code reviewer. You are shown one part of a pull "
+                    "request diff. Check it for correctness, code quality, potential bugs "
+                    "and security issues, in light of the issue it addresses. Return a "
+                    "JSON object with: approved (bool), summary (one or two sentences on "
+                    "what this part changes), issues (list of strings, each starting with "
+                    "the file path)."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Issue Description:\n{issue_description}\n\n"
+                    f"Files: {label}\n\n"
+                    f"Code Changes (diff):\n{diff}\n\n"
+                    "Please review this part of the changes."
+                ),
+            },
+        ]
+        try:
+            response = self.provider.generate(
+                messages, temperature=0.3, response_format={"type": "json_object"}
+            )
+            return parse_json_model(response, PieceReview).model_dump()
+        except Exception as e:
+            logger.warning("Review of %s failed (%s): %s", label, type(e).__name__, e)
+            return {
+                "approved": False,
+                "summary": f"Review of {label} could not be generated.",
+                "issues": [f"{label}: LLM review failed ({type(e).__name__})"],
+            }
+
+    def aggregate_reviews(
+        self,
+        piece_reviews: list[tuple[str, dict[str, Any]]],
+        issue_description: str,
+        ci_results: str | None = None,
+        previous_review: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Combine per-part reviews into the final verdict (the reduce step).
+
+        Only summaries and issues are sent, not the diff. Falls back to a mechanical
+        merge (approved only if every part was) when the LLM call fails.
+        """
+        merged = {
+            "approved": all(review["approved"] for _, review in piece_reviews),
+            "feedback": "\n".join(
+                f"- {label}: {review['summary']}" for label, review in piece_reviews
+            ),
+            "issues": [issue for _, review in piece_reviews for issue in review["issues"]],
+        }
+        ci_context = f"\n\nCI/CD Results:\n{ci_results}" if ci_results else ""
+        ci_context += _previous_review_context(previous_review)
+        findings = json.dumps(
+            [{"files": label, **review} for label, review in piece_reviews], indent=2
+        )
+
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are the lead reviewer of a pull request. Other reviewers each "
+                    "checked part of the diff. Combine their findings into one review: "
+                    "decide whether the PR as a whole solves the issue and can be "
+                    "approved, drop duplicate or contradicted issues, and take CI results "
+                    "into account. Return a JSON object with: approved (bool), "
+                    "feedback (str), issues (list of strings)."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Issue Description:\n{issue_description}\n\n"
+                    f"Per-part reviews:\n{findings}{ci_context}\n\n"
+                    "Please give the final review."
+                ),
+            },
+        ]
+        try:
+            response = self.provider.generate(
+                messages, temperature=0.3, response_format={"type": "json_object"}
+            )
+            return parse_json_model(response, ReviewResult).model_dump()
+        except Exception as e:
+            logger.warning("Review aggregation failed (%s): %s", type(e).__name__, e)
+            return merged
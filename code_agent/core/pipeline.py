@@ -0,0 +1,174 @@
+"""Dependency-graph executor for agent pipeline stages."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+from code_agent.utils.logger import log_context
+from code_agent.utils.tracing import bind_context, span
+
+logger = logging.getLogger(__name__)
+
+StageFn = Callable[[Mapping[str, Any]], Any]
+
+
+@dataclass
+class Stage:
+    """A named unit of work and the stages whose outputs it needs."""
+
+    name: str
+    fn: StageFn
+    deps: tuple[str, ...] = ()
+    exclusive: str | None = None
+    start: float = 0.0
+    end: float = 0.0
+
+
+class Pipeline:
+    """Run stages as soon as their dependencies finish, on a thread pool.
+
+    Each stage function receives the outputs of the completed stages. Stages that name
+    the same ``exclusive`` resource never run at the same time (e.g. stages reading
+    git objects through one non-thread-safe ``Repo``). The first failing stage stops
+    scheduling and its exception is re-raised once running stages have finished. A stage
+    can also call :meth:`stop` to skip the remaining stages without an error.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        """Initialize pipeline."""
+        self.max_workers = max(1, max_workers)
+        self.stages: dict[str, Stage] = {}
+        self.results: dict[str, Any] = {}
+        self._started_at = 0.0
+        self._finished_at = 0.0
+        self._stopped = False
+
+    def add(
+        self, name: str, fn: StageFn, deps: Sequence[str] = (), exclusive: str | None = None
+    ) -> None:
+        """Register a stage; dependencies must already be registered."""
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {', '.join(missing)}")
+        self.stages[name] = Stage(name, fn, tuple(deps), exclusive)
+
+    def stop(self) -> None:
+        """Start no further stages; ``run`` returns the outputs of the finished ones."""
+        self._stopped = True
+
+    def run(self) -> dict[str, Any]:
+        """Execute all stages and return their outputs by name."""
+        pending = dict(self.stages)
+        running: dict[Future[Any], Stage] = {}
+        held: set[str] = set()
+        error: BaseException | None = None
+        self._started_at = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as pool:
+            while pending or running:
+                if error is None and not self._stopped:
+                    for stage in list(pending.values()):
+                        if len(running) >= self.max_workers:
+                            break
+                        if any(dep not in self.results for dep in stage.deps):
+                            continue
+                        if stage.exclusive and stage.exclusive in held:
+                            continue
+                        del pending[stage.name]
+                        if stage.exclusive:
+                            held.add(stage.exclusive)
+                        running[pool.submit(bind_context(self._execute), stage)] = stage
+                elif not running:
+                    break
+
+                if not running:
+                    # Only reachable if a dependency can never complete.
+                    raise RuntimeError(f"Unschedulable stages: {', '.join(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    if stage.exclusive:
+                        held.discard(stage.exclusive)
+                    try:
+                        self.results[stage.name] = future.result()
+                    except BaseException as e:
+                        logger.error(f"Stage '{stage.name}' failed: {type(e).__name__}: {e}")
+                        error = error or e
+
+        self._finished_at = time.monotonic()
+        if error is not None:
+            raise error
+        return self.results
+
+    def _execute(self, stage: Stage) -> Any:
+        stage.start = time.monotonic()
+        try:
+            with (
+                log_context(stage=stage.name),
+                span(f"stage {stage.name}", **{"stage.exclusive": stage.exclusive}),
+            ):
+                return stage.fn(self.results)
+        finally:
+            stage.end = time.monotonic()
+            duration = stage.end - stage.start
+            logger.debug(
+                "Stage '%s' finished in %.2fs",
+                stage.name,
+                duration,
+                extra={"stage": stage.name, "duration_s": round(duration, 3)},
+            )
+
+    def critical_path(self) -> list[str]:
+        """Stages on the longest chain that determined the total run time.
+
+        Walks back from the last stage to finish, at each step following the
+        dependency (or same-resource stage) that finished last before it started.
+        """
+        finished = [stage for stage in self.stages.values() if stage.end]
+        if not finished:
+            return []
+
+        path = [max(finished, key=lambda s: s.end)]
+        while True:
+            current = path[-1]
+            blockers = [
+                stage
+                for stage in finished
+                if stage is not current
+                and stage.end <= current.start + 1e-6
+                and (
+                    stage.name in current.deps
+                    or (current.exclusive and stage.exclusive == current.exclusive)
+                )
+            ]
+            if not blockers:
+                break
+            path.append(max(blockers, key=lambda s: s.end))
+        return [stage.name for stage in reversed(path)]
+
+    def report(self) -> dict[str, Any]:
+        """Per-stage timings (seconds from pipeline start) and the critical path."""
+        critical_path = self.critical_path()
+        stages = {
+            stage.name: {
+                "start_s": round(stage.start - self._started_at, 3),
+                "duration_s": round(stage.end - stage.start, 3),
+                "critical": stage.name in critical_path,
+            }
+            for stage in self.stages.values()
+            if stage.end
+        }
+        return {
+            "wall_s": round(self._finished_at - self._started_at, 3),
+            "serial_s": round(sum(s["duration_s"] for s in stages.values()), 3),
+            "critical_path": critical_path,
+            "stages": stages,
+        }
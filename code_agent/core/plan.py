@@ -0,0 +1,92 @@
+"""Structured change plans produced by issue analysis."""
+
+from __future__ import annotations
+
+import json
+import logging
+import posixpath
+import re
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from code_agent.utils.llm_json import parse_json_model
+
+logger = logging.getLogger(__name__)
+
+
+class FileAction(BaseModel):
+    """One planned change to a repository file."""
+
+    path: str = Field(description="Repository-relative POSIX path")
+    action: Literal["modify", "create", "delete"]
+    rationale: str = Field(default="", description="Why this file needs the change")
+
+
+class ChangePlan(BaseModel):
+    """Analysis of an issue: a summary and the files to change."""
+
+    summary: str
+    files: list[FileAction] = Field(default_factory=list)
+
+
+def plan_schema() -> str:
+    """JSON schema of ``ChangePlan`` for inclusion in prompts."""
+    return json.dumps(ChangePlan.model_json_schema(), indent=2)
+
+
+def parse_plan(text: str) -> ChangePlan:
+    """Parse an LLM response into a ``ChangePlan``.
+
+    Accepts bare JSON or JSON inside a markdown code fence. Raises ``ValueError``
+    (including pydantic's ``ValidationError``) if the response does not match the schema.
+    """
+    return parse_json_model(text, ChangePlan)
+
+
+def normalize_path(path: str) -> str | None:
+    """Normalize a planned path; None if it is absolute or escapes the repository."""
+    cleaned = path.strip().strip("`'\"").replace("\\", "/")
+    if not cleaned or cleaned.startswith("/") or re.match(r"^[A-Za-z]:", cleaned):
+        return None
+
+    normalized = posixpath.normpath(cleaned)
+    parts = normalized.split("/")
+    if normalized == "." or ".." in parts or ".git" in parts:
+        return None
+    return normalized
+
+
+def validate_actions(
+    actions: list[FileAction], tracked_files: set[str]
+) -> tuple[list[FileAction], list[str]]:
+    """Split planned actions into accepted ones and rejection reasons.
+
+    ``modify``/``delete`` need an existing file; ``create`` of an existing file becomes
+    ``modify``, and creating a path that is an existing directory is rejected.
+    """
+    accepted: dict[str, FileAction] = {}
+    rejected: list[str] = []
+
+    for action in actions:
+        path = normalize_path(action.path)
+        if path is None:
+            rejected.append(f"{action.path}: invalid path")
+            continue
+
+        kind = action.action
+        if kind == "create" and path in tracked_files:
+            kind = "modify"
+        if kind in ("modify", "delete") and path not in tracked_files:
+            rejected.append(f"{path}: cannot {kind} a file that does not exist")
+            continue
+        if kind == "create" and any(f.startswith(path + "/") for f in tracked_files):
+            rejected.append(f"{path}: is an existing directory")
+            continue
+
+        if path not in accepted:
+            accepted[path] = FileAction(path=path, action=kind, rationale=action.rationale)
+
+    for reason in rejected:
+        logger.warning(f"Rejected planned change: {reason}")
+    return list(accepted.values()), rejected
@@ -0,0 +1,235 @@
+"""Cheap static classification of a PR diff before the LLM review."""
+
+from __future__ import annotations
+
+import ast
+import json
+import logging
+import re
+import shutil
+import subprocess
+from collections.abc import Callable
+from typing import Any
+
+from code_agent.core.review_split import split_diff
+from code_agent.core.validation import tool_configured
+
+logger = logging.getLogger(__name__)
+
+DOC_SUFFIXES = (".md", ".rst", ".txt", ".adoc")
+
+# Findings passed to the LLM are capped so they never dominate the prompt.
+MAX_FINDINGS = 30
+
+_HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+# A hunk with an empty old or new side covers a created or deleted file (API patches
+# carry no "new file mode" header).
+_WHOLE_FILE_HUNK_RE = re.compile(r"^@@ (?:-0,0 \+\d+(?:,\d+)?|-\d+(?:,\d+)? \+0,0) @@")
+
+ReadFile = Callable[[str], str | None]
+
+
+def _changed_lines(diff_text: str) -> tuple[list[str], list[str], list[int]]:
+    """Removed lines, added lines and the new-side line numbers of added lines."""
+    removed: list[str] = []
+    added: list[str] = []
+    added_numbers: list[int] = []
+    line_number = 0
+    in_hunk = False
+    for line in diff_text.splitlines():
+        hunk = _HUNK_RE.match(line)
+        if hunk:
+            line_number = int(hunk.group(1))
+            in_hunk = True
+        elif not in_hunk:
+            continue
+        elif line.startswith("+"):
+            added.append(line[1:])
+            added_numbers.append(line_number)
+            line_number += 1
+        elif line.startswith("-"):
+            removed.append(line[1:])
+        elif line.startswith(" "):
+            line_number += 1
+        elif line.startswith("diff --git") or line.startswith("="):
+            in_hunk = False
+    return removed, added, added_numbers
+
+
+def _change_blocks(diff_text: str) -> list[tuple[list[str], list[str]]]:
+    """Runs of removed/added lines between context lines, in diff order."""
+    blocks: list[tuple[list[str], list[str]]] = []
+    removed: list[str] = []
+    added: list[str] = []
+    in_hunk = False
+
+    def close() -> None:
+        nonlocal removed, added
+        if removed or added:
+            blocks.append((removed, added))
+        removed, added = [], []
+
+    for line in diff_text.splitlines():
+        if _HUNK_RE.match(line):
+            close()
+            in_hunk = True
+        elif not in_hunk:
+            continue
+        elif line.startswith("+"):
+            added.append(line[1:])
+        elif line.startswith("-"):
+            removed.append(line[1:])
+        elif line.startswith(" "):
+            close()
+        elif line.startswith("diff --git") or line.startswith("="):
+            close()
+            in_hunk = False
+    close()
+    return blocks
+
+
+def _significant(lines: list[str]) -> list[str]:
+    return [line.rstrip() for line in lines if line.strip()]
+
+
+def _whitespace_only(diff_text: str) -> bool:
+    """Each removed line is replaced in place by the same line up to trailing
+    whitespace; blank lines may come and go. Moved or reordered lines do not qualify."""
+    return all(
+        _significant(removed) == _significant(added) for removed, added in _change_blocks(diff_text)
+    )
+
+
+def _added_or_deleted(diff_text: str) -> bool:
+    """Whether the diff creates or removes the whole file."""
+    return any(
+        line.startswith(("new file mode", "deleted file mode", "--- /dev/null", "+++ /dev/null"))
+        or _WHOLE_FILE_HUNK_RE.match(line)
+        for line in diff_text.splitlines()
+    )
+
+
+def _is_doc(path: str) -> bool:
+    return path.lower().endswith(DOC_SUFFIXES) or path.split("/", 1)[0] in ("docs", "doc")
+
+
+def _same_ast(old: str, new: str) -> bool:
+    try:
+        return ast.dump(ast.parse(old)) == ast.dump(ast.parse(new))
+    except SyntaxError:
+        return False
+
+
+def classify_file(path: str, diff_text: str, old: str | None = None, new: str | None = None) -> str:
+    """Classify one file's change as ``formatting``, ``docs`` or ``code``.
+
+    ``formatting`` means each changed line is replaced in place by itself up to
+    trailing whitespace (blank lines may be added or removed). When both contents are
+    known, Python files must also parse to the same AST and other files must keep
+    their non-blank lines in order. Changes in indentation are never assumed harmless,
+    since they are semantic in Python/YAML. Added and deleted files are never
+    formatting (a missing side reads as empty, which an empty-module AST would match).
+    """
+    removed, added, _ = _changed_lines(diff_text)
+    if (not removed and not added) or _added_or_deleted(diff_text):
+        # Renames, mode changes, new or deleted files: let the reviewer see them.
+        return "docs" if _is_doc(path) else "code"
+    if old is not None and new is not None:
+        if path.endswith(".py"):
+            formatting = _same_ast(old, new)
+        else:
+            formatting = _whitespace_only(diff_text) and _significant(
+                old.splitlines()
+            ) == _significant(new.splitlines())
+    else:
+        formatting = _whitespace_only(diff_text)
+    if formatting:
+        return "formatting"
+    return "docs" if _is_doc(path) else "code"
+
+
+def ruff_findings(repo_root: str, path: str, content: str, lines: set[int]) -> list[str]:
+    """Ruff diagnostics on the given lines of a file (only if the repo configures ruff)."""
+    if not shutil.which("ruff") or not tool_configured(repo_root, "ruff"):
+        return []
+    try:
+        proc = subprocess.run(
+            ["ruff", "check", "--no-fix", "--output-format=json", "--stdin-filename", path, "-"],
+            cwd=repo_root,
+            input=content,
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        diagnostics = json.loads(proc.stdout or "[]")
+    except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+        logger.warning("ruff pre-review of %s failed (%s): %s", path, type(e).__name__, e)
+        return []
+    return [
+        f"{path}:{d['location']['row']}: {d.get('code') or 'ruff'} {d['message']}"
+        for d in diagnostics
+        if d.get("location", {}).get("row") in lines
+    ]
+
+
+def prereview(
+    diff: str,
+    read_old: ReadFile | None = None,
+    read_new: ReadFile | None = None,
+    repo_root: str | None = None,
+    small_lines: int = 3,
+) -> dict[str, Any]:
+    """Classify a diff and collect deterministic findings on the changed lines.
+
+    Returns ``{"kind", "files", "changed_lines", "findings", "verified"}`` where
+    ``kind`` is ``formatting`` (no semantic change anywhere), ``docs`` (only
+    documentation besides formatting), ``small`` (at most ``small_lines`` changed code
+    lines) or ``full``. ``verified`` is true only for a formatting diff that was
+    checked against the contents of every file, which requires ``read_old`` and
+    ``read_new``; without them only diff-level checks are done.
+    """
+    files: dict[str, str] = {}
+    findings: list[str] = []
+    code_lines = 0
+    verified = read_old is not None and read_new is not None
+    for path, text in split_diff(diff):
+        old = read_old(path) if read_old else None
+        new = read_new(path) if read_new else None
+        verified = verified and old is not None and new is not None
+        kind = classify_file(path, text, old, new)
+        files[path] = kind
+
+        removed, added, added_numbers = _changed_lines(text)
+        if kind == "code":
+            code_lines += len(removed) + len(added)
+        if new is None or not added_numbers or not path.endswith(".py"):
+            continue
+        try:
+            ast.parse(new, filename=path)
+        except SyntaxError as e:
+            findings.append(f"{path}:{e.lineno}: SyntaxError: {e.msg}")
+            continue
+        if repo_root:
+            findings += ruff_findings(repo_root, path, new, set(added_numbers))
+
+    kinds = set(files.values())
+    if not files or kinds == {"formatting"}:
+        kind = "formatting"
+    elif kinds <= {"formatting", "docs"}:
+        kind = "docs"
+    elif code_lines <= small_lines:
+        kind = "small"
+    else:
+        kind = "full"
+    return {
+        "kind": kind,
+        "files": files,
+        "changed_lines": code_lines,
+        "findings": findings[:MAX_FINDINGS],
+        "verified": kind == "formatting" and bool(files) and verified,
+    }
+
+
+def format_findings(findings: list[str]) -> str:
+    """Prompt section listing deterministic findings."""
+    return "Static analysis of the changed lines:\n" + "\n".join(f"- {f}" for f in findings)
@@ -0,0 +1,159 @@
+"""Lexical file ranking (BM25) for narrowing LLM context to relevant files."""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from code_agent.core.github_client import GitRepo
+
+logger = logging.getLogger(__name__)
+
+# Bump when tokenization changes so stale on-disk indexes are ignored.
+INDEX_VERSION = 1
+
+# Files larger than this are indexed by path only.
+MAX_INDEXED_BYTES = 256 * 1024
+
+# Path tokens are a strong signal ("fix the cli" -> cli.py), so weight them up.
+PATH_TOKEN_WEIGHT = 3
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9_]*")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+_STOPWORDS = frozenset("""
+    a an and are as at be but by can def do does else for from has have if import in
+    is it its not of on or return self should so than that the then this to was we
+    when which while will with you your none true false class pass
+    """.split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase terms, breaking up snake_case and camelCase identifiers."""
+    terms: list[str] = []
+    for word in _WORD_RE.findall(text):
+        lowered = word.lower()
+        parts = [p.lower() for chunk in word.split("_") for p in _CAMEL_RE.findall(chunk)]
+        if len(parts) > 1 and lowered not in _STOPWORDS:
+            # Keep the full identifier too, so exact symbol mentions score highest.
+            terms.append(lowered.replace("_", ""))
+        terms.extend(p for p in parts if len(p) > 1 and p not in _STOPWORDS)
+    return terms
+
+
+def _path_terms(path: str) -> list[str]:
+    """Tokenize a file path (directories, stem and extension)."""
+    return tokenize(re.sub(r"[/.\-]", " ", path))
+
+
+class FileRanker:
+    """BM25 ranking of tracked repository files against free text.
+
+    The index is built from the blobs of a commit (not the working tree), so it is
+    stable while branches are being checked out, and is cached on disk per commit.
+    """
+
+    def __init__(self, git_repo: GitRepo, k1: float = 1.5, b: float = 0.75) -> None:
+        """Initialize ranker."""
+        self.git_repo = git_repo
+        self.k1 = k1
+        self.b = b
+        self._indexes: dict[str, dict[str, Any]] = {}
+
+    def rank(self, query: str, top_k: int = 20, ref: str = "HEAD") -> list[tuple[str, float]]:
+        """Return up to ``top_k`` (path, score) pairs, best match first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        index = self.get_index(ref)
+        paths: list[str] = index["paths"]
+        lengths: list[int] = index["lengths"]
+        postings: dict[str, list[list[int]]] = index["postings"]
+        if not paths:
+            return []
+
+        n_docs = len(paths)
+        avg_len = (sum(lengths) / n_docs) or 1.0
+        scores: dict[int, float] = {}
+
+        for term in terms:
+            docs = postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs:
+                norm = self.k1 * (1 - self.b + self.b * lengths[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], paths[item[0]]))[:top_k]
+        return [(paths[doc_id], round(score, 4)) for doc_id, score in best]
+
+    def get_index(self, ref: str = "HEAD") -> dict[str, Any]:
+        """Load the index for ``ref`` from memory/disk, building it if needed."""
+        sha = self.git_repo.head_sha(ref)
+        if sha in self._indexes:
+            return self._indexes[sha]
+
+        cache_path = self.git_repo.state_dir("retrieval") / f"{sha}.json"
+        index: dict[str, Any] | None = None
+        if cache_path.exists():
+            try:
+                index = json.loads(cache_path.read_text(encoding="utf-8"))
+                if index.get("version") != INDEX_VERSION:
+                    index = None
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable retrieval index %s: %s", cache_path, e)
+                index = None
+
+        if index is None:
+            index = self._build_index(sha)
+            try:
+                cache_path.write_text(json.dumps(index), encoding="utf-8")
+            except OSError as e:
+                logger.warning("Could not cache retrieval index: %s", e)
+
+        self._indexes[sha] = index
+        return index
+
+    def _build_index(self, sha: str) -> dict[str, Any]:
+        """Build a sparse term -> [[doc_id, tf], ...] index for every blob in a commit."""
+        commit = self.git_repo.repo.commit(sha)
+        paths: list[str] = []
+        lengths: list[int] = []
+        postings: dict[str, list[list[int]]] = {}
+
+        for item in commit.tree.traverse():
+            if item.type != "blob":
+                continue
+
+            counts: Counter[str] = Counter()
+            for term in _path_terms(item.path):
+                counts[term] += PATH_TOKEN_WEIGHT
+
+            if item.size <= MAX_INDEXED_BYTES:
+                data = item.data_stream.read()
+                if b"\0" not in data[:8000]:
+                    counts.update(tokenize(data.decode("utf-8", errors="ignore")))
+
+            doc_id = len(paths)
+            paths.append(item.path)
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append([doc_id, tf])
+
+        logger.info(
+            "Built retrieval index for %s (%d files, %d terms)", sha[:12], len(paths), len(postings)
+        )
+        return {
+            "version": INDEX_VERSION,
+            "commit": sha,
+            "paths": paths,
+            "lengths": lengths,
+            "postings": postings,
+        }
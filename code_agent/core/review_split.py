@@ -0,0 +1,131 @@
+"""Split PR diffs into per-file review pieces; models of per-piece review results."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel, Field
+
+_GIT_HEADER_RE = re.compile(r"^diff --git a/.* b/(.*)$")
+_API_HEADER_RE = re.compile(r"^File: (.+)$")
+
+
+@dataclass
+class DiffPiece:
+    """A self-contained part of a PR diff: one or more files, or some hunks of one file."""
+
+    paths: list[str]
+    text: str
+    part: str = ""  # e.g. "2/3" when a large file is split by hunks
+
+    @property
+    def label(self) -> str:
+        """Files covered by the piece, for prompts and logs."""
+        label = ", ".join(self.paths)
+        return f"{label} (part {self.part})" if self.part else label
+
+
+@dataclass
+class _FileDiff:
+    path: str
+    lines: list[str] = field(default_factory=list)
+
+
+class PieceReview(BaseModel):
+    """Review of one diff piece."""
+
+    approved: bool
+    summary: str = ""
+    issues: list[str] = Field(default_factory=list)
+
+
+class ReviewResult(BaseModel):
+    """Final review of a PR."""
+
+    approved: bool
+    feedback: str = ""
+    issues: list[str] = Field(default_factory=list)
+
+
+def split_diff(diff: str) -> list[tuple[str, str]]:
+    """Split a diff into ``(path, text)`` per file.
+
+    Understands ``git diff`` output and the ``File: ...`` blocks built from the GitHub
+    files API. Text before the first file header is kept with the first file.
+    """
+    files: list[_FileDiff] = []
+    preamble: list[str] = []
+    lines = diff.splitlines(keepends=True)
+    for index, line in enumerate(lines):
+        stripped = line.rstrip("\n")
+        git_header = _GIT_HEADER_RE.match(stripped)
+        api_header = _API_HEADER_RE.match(stripped)
+        if git_header:
+            files.append(_FileDiff(git_header.group(1)))
+        elif api_header and index > 0 and set(lines[index - 1].strip()) == {"="}:
+            # The separator line above the header belongs to this file.
+            separator = (files[-1].lines if files else preamble).pop()
+            files.append(_FileDiff(api_header.group(1).strip(), [separator]))
+            files[-1].lines.append(line)
+            continue
+
+        (files[-1].lines if files else preamble).append(line)
+
+    if not files:
+        return [("", diff)] if diff.strip() else []
+    if "".join(preamble).strip():
+        files[0].lines[:0] = preamble
+    return [(f.path, "".join(f.lines)) for f in files]
+
+
+def _split_hunks(text: str) -> tuple[str, list[str]]:
+    """File header and hunks (each starting at its ``@@`` line) of one file's diff."""
+    header: list[str] = []
+    hunks: list[list[str]] = []
+    for line in text.splitlines(keepends=True):
+        if line.startswith("@@"):
+            hunks.append([line])
+        elif hunks:
+            hunks[-1].append(line)
+        else:
+            header.append(line)
+    return "".join(header), ["".join(hunk) for hunk in hunks]
+
+
+def pack_pieces(diff: str, max_chars: int) -> list[DiffPiece]:
+    """Split a diff into pieces of roughly at most ``max_chars`` each.
+
+    Small files are packed together so tiny PRs still take a single call; a file larger
+    than ``max_chars`` is split into groups of whole hunks, each repeating the file
+    header. A single hunk larger than the limit is kept whole.
+    """
+    pieces: list[DiffPiece] = []
+    batch: list[tuple[str, str]] = []
+
+    def flush() -> None:
+        if batch:
+            pieces.append(DiffPiece([path for path, _ in batch], "".join(t for _, t in batch)))
+            batch.clear()
+
+    for path, text in split_diff(diff):
+        if len(text) > max_chars:
+            header, hunks = _split_hunks(text)
+            groups: list[list[str]] = [[]]
+            for hunk in hunks:
+                size = len(header) + sum(len(h) for h in groups[-1])
+                if groups[-1] and size + len(hunk) > max_chars:
+                    groups.append([])
+                groups[-1].append(hunk)
+            if len(groups) > 1:
+                for index, group in enumerate(groups, 1):
+                    pieces.append(
+                        DiffPiece([path], header + "".join(group), f"{index}/{len(groups)}")
+                    )
+                continue
+
+        if batch and sum(len(t) for _, t in batch) + len(text) > max_chars:
+            flush()
+        batch.append((path, text))
+    flush()
+    return pieces
@@ -0,0 +1,155 @@
+"""Map review feedback to the files and line ranges it is about."""
+
+from __future__ import annotations
+
+import ast
+import re
+from collections.abc import Callable
+from typing import Any
+
+# Lines of context added around non-Python (or unparsable) targets.
+CONTEXT_LINES = 5
+
+# Above this share of the file, regenerating the whole file is simpler and as cheap.
+WHOLE_FILE_RATIO = 0.6
+
+_LINE_REF_RE = re.compile(r"\b(?:lines?|L)\s*(\d+)(?:\s*(?:-|–|to)\s*L?(\d+))?", re.IGNORECASE)
+_SYMBOL_RE = re.compile(r"`([A-Za-z_][A-Za-z0-9_]*)(?:\(\))?`|\b([A-Za-z_][A-Za-z0-9_]*)\(\)")
+
+LineRange = tuple[int, int]
+
+
+def map_feedback_to_targets(
+    feedback: str,
+    review_comments: list[dict[str, Any]],
+    pr_files: list[str],
+    read_file: Callable[[str], str] | None = None,
+) -> dict[str, list[LineRange]]:
+    """Find which PR files (and 1-based line ranges) the feedback refers to.
+
+    Sources, in order: inline review comments (exact lines), ``path:line`` and
+    "line N" references next to a file mention, and backticked/called symbol names
+    defined in a PR's Python file (resolved via ``read_file``). An empty range list
+    means the file is mentioned but not a specific region. Returns ``{}`` when nothing
+    in the feedback can be tied to a PR file.
+    """
+    targets: dict[str, list[LineRange]] = {}
+
+    for comment in review_comments:
+        path = comment.get("path")
+        line = comment.get("line")
+        if path not in pr_files:
+            continue
+        ranges = targets.setdefault(path, [])
+        if line:
+            ranges.append((int(comment.get("start_line") or line), int(line)))
+
+    current: str | None = None
+    for text_line in feedback.splitlines():
+        mentioned = [p for p in pr_files if _mentions(text_line, p)]
+        if mentioned:
+            current = mentioned[0]
+            for path in mentioned:
+                targets.setdefault(path, [])
+                for match in re.finditer(rf"{re.escape(path)}:(\d+)(?:-(\d+))?", text_line):
+                    targets[path].append(_range(match.group(1), match.group(2)))
+
+        if current is None:
+            continue
+        for match in _LINE_REF_RE.finditer(text_line):
+            targets[current].append(_range(match.group(1), match.group(2)))
+
+    if read_file is not None:
+        symbols = {a or b for a, b in _SYMBOL_RE.findall(feedback)}
+        for path in pr_files:
+            if symbols and path.endswith(".py"):
+                found = find_symbol_ranges(read_file(path), symbols)
+                if found:
+                    targets.setdefault(path, []).extend(found)
+
+    return targets
+
+
+def _mentions(text: str, path: str) -> bool:
+    """Check whether a line of text mentions a file by path or unique-looking basename."""
+    if path in text:
+        return True
+    basename = path.rsplit("/", 1)[-1]
+    return re.search(rf"(?<![\w/.-]){re.escape(basename)}\b", text) is not None
+
+
+def _range(start: str, end: str | None) -> LineRange:
+    first, last = int(start), int(end or start)
+    return (min(first, last), max(first, last))
+
+
+def find_symbol_ranges(source: str, names: set[str]) -> list[LineRange]:
+    """Line ranges of functions/classes called ``names`` (decorators included)."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+
+    return [
+        _node_range(node)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef)
+        and node.name in names
+    ]
+
+
+def _node_range(node: ast.AST) -> LineRange:
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return (start, node.end_lineno or node.lineno)
+
+
+def expand_ranges(source: str, file_path: str, ranges: list[LineRange]) -> list[LineRange]:
+    """Widen ranges to whole enclosing definitions (Python) or add context lines, then merge.
+
+    Returns ``[]`` when the result would cover most of the file.
+    """
+    total = len(source.splitlines())
+    if not ranges or total == 0:
+        return []
+
+    definitions: list[LineRange] = []
+    if file_path.endswith(".py"):
+        try:
+            tree = ast.parse(source)
+            definitions = [
+                _node_range(node)
+                for node in ast.walk(tree)
+                if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef)
+            ]
+        except SyntaxError:
+            definitions = []
+
+    widened = []
+    for start, end in ranges:
+        enclosing = [d for d in definitions if d[0] <= start and end <= d[1]]
+        if enclosing:
+            # Innermost definition: the smallest one containing the range.
+            widened.append(min(enclosing, key=lambda d: d[1] - d[0]))
+        else:
+            widened.append((max(1, start - CONTEXT_LINES), min(total, end + CONTEXT_LINES)))
+
+    merged: list[LineRange] = []
+    for start, end in sorted(widened):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, min(end, total)))
+
+    covered = sum(end - start + 1 for start, end in merged)
+    if covered > total * WHOLE_FILE_RATIO:
+        return []
+    return merged
+
+
+def replace_lines(source: str, start: int, end: int, replacement: str) -> str:
+    """Replace 1-based inclusive lines ``start..end`` of ``source``."""
+    lines = source.splitlines(keepends=True)
+    new_lines = replacement.splitlines(keepends=True)
+    if new_lines and not new_lines[-1].endswith("\n") and end < len(lines):
+        new_lines[-1] += "\n"
+    return "".join(lines[: start - 1] + new_lines + lines[end:])
@@ -0,0 +1,247 @@
+"""Local pre-push validation of generated changes, cached by git tree hash."""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from code_agent.utils.tracing import bind_context, span
+
+if TYPE_CHECKING:
+    from code_agent.core.github_client import GitRepo
+
+logger = logging.getLogger(__name__)
+
+# Keep tool output small enough to feed back into a generation prompt.
+MAX_OUTPUT_CHARS = 4000
+
+# pytest exit codes for an interrupted run, an internal error and a usage error: the
+# suite could not run here (e.g. a dependency missing from the agent's environment).
+_PYTEST_ENVIRONMENT_EXIT_CODES = (2, 3, 4)
+
+# Tools that are only run when the target repository configures them, so files are
+# not "failed" for style rules the project never adopted.
+_TOOL_CONFIG = {
+    "ruff": ("[tool.ruff", ("ruff.toml", ".ruff.toml")),
+    "black": ("[tool.black", ()),
+}
+
+
+def tool_configured(repo_root: str, tool: str) -> bool:
+    """Check whether the repository at ``repo_root`` configures a linter/formatter."""
+    marker, config_files = _TOOL_CONFIG[tool]
+    if any(os.path.exists(os.path.join(repo_root, name)) for name in config_files):
+        return True
+    try:
+        with open(os.path.join(repo_root, "pyproject.toml"), encoding="utf-8") as f:
+            return marker in f.read()
+    except OSError:
+        return False
+
+
+def is_test_file(path: str) -> bool:
+    """Check whether a path looks like a pytest test module."""
+    name = os.path.basename(path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+class Validator:
+    """Run ast.parse, ruff, black --check and pytest on a candidate tree.
+
+    The candidate is built as a dangling commit on top of the base (no branch is
+    moved), so its tree hash identifies the exact content; passing results are cached
+    per tree hash, checks and test selection, so identical trees are never validated
+    twice. Failures (including timeouts) are always re-run. A pytest run that could not
+    collect the suite in this environment reports ``error``: it fails validation but is
+    not blamed on any changed file, so it never triggers regeneration.
+    """
+
+    def __init__(
+        self, git_repo: GitRepo, checks: list[str] | None = None, timeout: int = 300
+    ) -> None:
+        """Initialize validator."""
+        self.git_repo = git_repo
+        self.checks = checks or ["ast", "ruff", "black", "pytest"]
+        self.timeout = timeout
+
+    def validate(
+        self, base_ref: str, changes: dict[str, str | None], tests: list[str] | None = None
+    ) -> dict[str, Any]:
+        """Validate ``changes`` applied on ``base_ref`` (``None`` content deletes a file).
+
+        ``tests`` selects the pytest targets (default: the changed test files). Returns
+        ``{"tree", "passed", "checks", "failed_files", "cached"}`` where ``failed_files``
+        maps a changed path to the error messages attributed to it.
+        """
+        commit_sha = self.git_repo.commit_tree(base_ref, changes, "code-agent validation")
+        tree_sha = self.git_repo.repo.commit(commit_sha).tree.hexsha
+        if tests is None:
+            tests = [path for path, content in changes.items() if is_test_file(path) and content]
+
+        options = json.dumps({"checks": sorted(self.checks), "tests": sorted(tests)})
+        cache_key = f"{tree_sha}-{hashlib.sha256(options.encode()).hexdigest()[:16]}"
+        cache_path = self.git_repo.state_dir("validation") / f"{cache_key}.json"
+        if cache_path.exists():
+            try:
+                result = json.loads(cache_path.read_text(encoding="utf-8"))
+                result["cached"] = True
+                logger.info(f"Validation result for tree {tree_sha[:12]} loaded from cache")
+                return result
+            except ValueError:
+                pass
+
+        result = self._run(commit_sha, tree_sha, changes, tests)
+        if result["passed"]:
+            cache_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        result["cached"] = False
+        return result
+
+    def _run(
+        self, commit_sha: str, tree_sha: str, changes: dict[str, str | None], tests: list[str]
+    ) -> dict[str, Any]:
+        """Run all configured checks (subprocess checks in parallel)."""
+        python_files = [
+            path
+            for path, content in changes.items()
+            if path.endswith(".py") and content is not None
+        ]
+        checks: dict[str, dict[str, Any]] = {}
+        failed_files: dict[str, list[str]] = {}
+
+        if "ast" in self.checks:
+            errors = []
+            for path in python_files:
+                try:
+                    ast.parse(changes[path] or "", filename=path)
+                except SyntaxError as e:
+                    message = f"{path}:{e.lineno}: SyntaxError: {e.msg}"
+                    errors.append(message)
+                    failed_files.setdefault(path, []).append(message)
+            checks["ast"] = {
+                "status": "failed" if errors else "passed",
+                "output": "\n".join(errors),
+            }
+
+        commands = self._commands(python_files, tests)
+        if commands:
+            with tempfile.TemporaryDirectory(prefix="code-agent-validate-") as tmp:
+                worktree = os.path.join(tmp, "tree")
+                self.git_repo.repo.git.worktree("add", "--detach", worktree, commit_sha)
+                try:
+                    with ThreadPoolExecutor(max_workers=len(commands)) as pool:
+                        futures = {
+                            name: pool.submit(bind_context(self._run_command), name, cmd, worktree)
+                            for name, cmd in commands.items()
+                        }
+                        for name, future in futures.items():
+                            checks[name] = future.result()
+                finally:
+                    self.git_repo.repo.git.worktree("remove", "--force", worktree)
+
+        for name in self.checks:
+            checks.setdefault(name, {"status": "skipped", "output": ""})
+
+        for name, check in checks.items():
+            if name == "ast" or check["status"] != "failed":
+                continue
+            for path, message in self._attribute(name, check["output"], python_files):
+                failed_files.setdefault(path, []).append(message)
+
+        passed = all(check["status"] not in ("failed", "error") for check in checks.values())
+        logger.info(
+            "Validation of tree %s: %s (%s)",
+            tree_sha[:12],
+            "passed" if passed else "failed",
+            ", ".join(f"{name}={check['status']}" for name, check in checks.items()),
+        )
+        return {"tree": tree_sha, "passed": passed, "checks": checks, "failed_files": failed_files}
+
+    def _commands(self, python_files: list[str], tests: list[str]) -> dict[str, list[str]]:
+        """Build the subprocess commands that apply to this change."""
+        commands: dict[str, list[str]] = {}
+        if python_files:
+            tools = (
+                ("ruff", ["check", "--no-fix", "--output-format=concise"]),
+                ("black", ["--check", "--quiet"]),
+            )
+            for tool, args in tools:
+                if (
+                    tool in self.checks
+                    and tool_configured(self.git_repo.repo_path, tool)
+                    and shutil.which(tool)
+                ):
+                    commands[tool] = [tool, *args, *python_files]
+        if tests and "pytest" in self.checks and shutil.which("pytest"):
+            commands["pytest"] = [
+                "pytest",
+                "-q",
+                "-x",
+                "--no-header",
+                "-p",
+                "no:cacheprovider",
+                *tests,
+            ]
+        return commands
+
+    def _run_command(self, name: str, command: list[str], cwd: str) -> dict[str, Any]:
+        """Run one check command and summarize its result."""
+        with span("validation.check", **{"check.command": " ".join(command[:4])}) as current:
+            try:
+                proc = subprocess.run(
+                    command, cwd=cwd, capture_output=True, text=True, timeout=self.timeout
+                )
+            except subprocess.TimeoutExpired:
+                # A hung check (e.g. a test waiting forever) must not count as passing.
+                current.set_attribute("check.status", "failed")
+                return {"status": "failed", "output": f"Timed out after {self.timeout}s"}
+            except OSError as e:
+                current.set_attribute("check.status", "error")
+                return {"status": "error", "output": f"{type(e).__name__}: {e}"}
+
+            output = (proc.stdout + proc.stderr).strip()
+            # pytest exit code 5 means "no tests collected"; not a failure of the change.
+            status = "passed" if proc.returncode in (0, 5) else "failed"
+            if name == "pytest" and _environment_error(proc.returncode, output):
+                logger.warning(
+                    "pytest could not run in this environment (exit %d); "
+                    "not attributing it to the changed files",
+                    proc.returncode,
+                )
+                status = "error"
+            current.set_attribute("check.status", status)
+            current.set_attribute("check.output_bytes", len(output))
+            return {"status": status, "output": output[-MAX_OUTPUT_CHARS:]}
+
+    def _attribute(self, check: str, output: str, python_files: list[str]) -> list[tuple[str, str]]:
+        """Attribute failure output lines to changed files."""
+        found = []
+        for path in python_files:
+            lines = [
+                line for line in output.splitlines() if re.search(rf"\b{re.escape(path)}\b", line)
+            ]
+            if lines:
+                found.extend((path, f"{check}: {line.strip()}") for line in lines[:20])
+
+        if not found and check == "pytest":
+            # Test failures can't be pinned to one file; blame every changed source file.
+            summary = output.splitlines()[-1] if output else "pytest failed"
+            found = [
+                (path, f"pytest: {summary}") for path in python_files if not is_test_file(path)
+            ] or [(path, f"pytest: {summary}") for path in python_files]
+        return found
+
+
+def _environment_error(returncode: int, output: str) -> bool:
+    """Whether a pytest failure comes from the environment rather than the change."""
+    if returncode in _PYTEST_ENVIRONMENT_EXIT_CODES:
+        return True
+    return "ModuleNotFoundError" in output and "during collection" in output
@@ -0,0 +1,330 @@
+"""Long-running agent daemon and its Unix-socket client.
+
+The daemon keeps the GitHub client, LLM service and per-repository agents warm and
+executes CLI commands sent as JSON lines over a local Unix socket. The client side
+only uses the standard library, so a forwarding CLI call stays cheap to start.
+
+Forwarding is opt-in (``CODE_AGENT_DAEMON=1``). Every request carries the client's
+repository and a fingerprint of all its settings (token, ``DEMO_MODE``, LLM provider,
+iteration limit, ...); the daemon refuses requests whose identity differs from its own,
+and the client then runs the command in-process.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import uuid
+from typing import Any
+
+from code_agent.utils import tracing
+from code_agent.utils.logger import log_context
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = "CODE_AGENT_SOCKET"
+
+# Set to "1" to forward commands to a running daemon.
+USE_DAEMON_ENV = "CODE_AGENT_DAEMON"
+
+CONNECT_TIMEOUT = 5.0
+
+# Longest wait for a command's response (auto-loop runs can take a while).
+RESPONSE_TIMEOUT = 3600.0
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket."""
+
+
+class DaemonError(Exception):
+    """A command failed inside the daemon."""
+
+
+def default_socket_path() -> str:
+    """Socket path from ``CODE_AGENT_SOCKET``, else a per-user path in the runtime dir."""
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"code-agent-{os.getuid()}.sock")
+
+
+def identity() -> dict[str, str]:
+    """Repository and settings fingerprint that commands of this process run with."""
+    from code_agent.config import settings
+
+    return {
+        "repo": settings.github_repo,
+        "settings": hashlib.sha256(settings.model_dump_json().encode("utf-8")).hexdigest()[:16],
+    }
+
+
+def call(
+    command: str,
+    socket_path: str | None = None,
+    timeout: float = RESPONSE_TIMEOUT,
+    **args: Any,
+) -> Any:
+    """Run ``command`` in the daemon and return its result.
+
+    Raises ``DaemonUnavailable`` if no daemon accepts the connection or the daemon
+    refused the request (nothing has been executed then) and ``DaemonError`` if the
+    command itself failed or no response arrived within ``timeout`` seconds.
+    """
+    path = socket_path or default_socket_path()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        raise DaemonUnavailable(path)
+
+    request = {"command": command, "args": args}
+    if command not in _UNCHECKED_COMMANDS:
+        request["identity"] = identity()
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError as e:
+            raise DaemonUnavailable(f"{path}: {e}") from e
+
+        sock.settimeout(timeout)
+        try:
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        except TimeoutError as e:
+            raise DaemonError(f"No response from the daemon within {timeout:g}s") from e
+    finally:
+        sock.close()
+
+    if not line:
+        raise DaemonError("Daemon closed the connection without a response")
+    response = json.loads(line)
+    if response.get("rejected"):
+        raise DaemonUnavailable(response.get("error", "request rejected"))
+    if not response.get("ok"):
+        raise DaemonError(response.get("error", "unknown daemon error"))
+    return response.get("result")
+
+
+def run(command: str, context: AgentContext | None = None, **args: Any) -> Any:
+    """Run a command in the daemon if one is running, otherwise in this process."""
+    # The daemon has its own working directory; send absolute paths.
+    if args.get("repo_path"):
+        args["repo_path"] = os.path.abspath(args["repo_path"])
+    elif command in AgentContext.CHECKOUT_COMMANDS:
+        args["repo_path"] = os.getcwd()
+    if args.get("trace_out"):
+        args["trace_out"] = os.path.abspath(args["trace_out"])
+    else:
+        args.pop("trace_out", None)
+
+    if os.environ.get(USE_DAEMON_ENV) == "1":
+        try:
+            result = call(command, **args)
+            logger.debug("Command %s ran in the daemon", command)
+            return result
+        except DaemonUnavailable as e:
+            logger.debug("Running %s in-process: %s", command, e)
+    return (context or AgentContext()).execute(command, args)
+
+
+class AgentContext:
+    """Clients and agents shared by all commands of one process.
+
+    Agents are created on first use per repository path; commands for the same
+    repository are serialized because they share its working tree.
+    """
+
+    COMMANDS = ("process_issue", "review_pr", "fix_pr", "auto_loop", "generate_summary", "ping")
+
+    # Commands that work in a local clone (the current directory by default).
+    CHECKOUT_COMMANDS = ("process_issue", "fix_pr", "auto_loop")
+
+    def __init__(self) -> None:
+        """Initialize agent context."""
+        self._lock = threading.Lock()
+        self._repo_locks: dict[str, threading.Lock] = {}
+        self._github_client: Any = None
+        self._llm_service: Any = None
+        self._code_agents: dict[str, Any] = {}
+        self._reviewers: dict[str, Any] = {}
+
+    def github_client(self) -> Any:
+        """Shared GitHub client."""
+        with self._lock:
+            if self._github_client is None:
+                from code_agent.core.github_client import GitHubClient
+
+                self._github_client = GitHubClient()
+            return self._github_client
+
+    def llm_service(self) -> Any:
+        """Shared LLM service."""
+        with self._lock:
+            if self._llm_service is None:
+                from code_agent.core.llm import LLMService
+
+                self._llm_service = LLMService()
+            return self._llm_service
+
+    def code_agent(self, repo_path: str) -> Any:
+        """Code agent for a repository."""
+        from code_agent.agents.code_agent import CodeAgent
+
+        github_client, llm_service = self.github_client(), self.llm_service()
+        with self._lock:
+            if repo_path not in self._code_agents:
+                self._code_agents[repo_path] = CodeAgent(
+                    github_client=github_client, llm_service=llm_service, repo_path=repo_path
+                )
+            return self._code_agents[repo_path]
+
+    def reviewer(self, repo_path: str | None) -> Any:
+        """Reviewer agent for a repository (or without a local clone)."""
+        from code_agent.agents.reviewer_agent import ReviewerAgent
+
+        github_client, llm_service = self.github_client(), self.llm_service()
+        key = repo_path or ""
+        with self._lock:
+            if key not in self._reviewers:
+                self._reviewers[key] = ReviewerAgent(
+                    github_client=github_client, llm_service=llm_service, repo_path=repo_path
+                )
+            return self._reviewers[key]
+
+    def _repo_lock(self, repo_path: str | None) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(repo_path or "", threading.Lock())
+
+    def execute(self, command: str, args: dict[str, Any]) -> Any:
+        """Run one CLI command with the shared clients.
+
+        A ``trace_out`` argument records the command's spans to that file.
+        """
+        if command not in self.COMMANDS:
+            raise ValueError(f"Unknown command: {command}")
+        if command == "ping":
+            return {"pid": os.getpid()}
+
+        args = dict(args)
+        trace_out = args.pop("trace_out", None)
+        with log_context(
+            run_id=uuid.uuid4().hex[:12],
+            command=command,
+            issue=args.get("issue_number"),
+            pr=args.get("pr_number"),
+        ):
+            if not trace_out:
+                return self._execute(command, args)
+            with tracing.record(trace_out), tracing.span(f"code-agent {command}", **_scalars(args)):
+                return self._execute(command, args)
+
+    def _execute(self, command: str, args: dict[str, Any]) -> Any:
+        repo_path = args.get("repo_path")
+        with self._repo_lock(repo_path):
+            if command == "process_issue":
+                return self.code_agent(repo_path or os.getcwd()).process_issue(args["issue_number"])
+            if command == "fix_pr":
+                return self.code_agent(repo_path or os.getcwd()).fix_pr_issues(
+                    args["pr_number"], args["feedback"], args.get("iteration", 1)
+                )
+            if command == "review_pr":
+                return self.reviewer(repo_path).review_pull_request(args["pr_number"])
+            if command == "generate_summary":
+                return self.reviewer(repo_path).generate_review_summary(args["pr_number"])
+
+            from code_agent.agents.auto_loop import AutoLoop
+
+            loop = AutoLoop(
+                github_client=self.github_client(),
+                llm_service=self.llm_service(),
+                repo_path=repo_path,
+                max_iterations=args.get("max_iterations"),
+            )
+            return loop.run(args["issue_number"])
+
+
+def _scalars(args: dict[str, Any]) -> dict[str, Any]:
+    """Command arguments usable as span attributes."""
+    return {
+        f"args.{key}": value
+        for key, value in args.items()
+        if isinstance(value, str | int | float | bool) and key != "feedback"
+    }
+
+
+# Commands that never touch a repository and are accepted without an identity.
+_UNCHECKED_COMMANDS = ("ping", "shutdown")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: AgentDaemon
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            command = request["command"]
+            if (
+                command not in _UNCHECKED_COMMANDS
+                and request.get("identity") != self.server.identity
+            ):
+                logger.warning("Daemon refused %s: repository or settings differ", command)
+                response: dict[str, Any] = {
+                    "ok": False,
+                    "rejected": True,
+                    "error": "Daemon serves a different repository or settings",
+                }
+            elif command == "shutdown":
+                response = {"ok": True, "result": None}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                logger.info("Daemon command: %s %s", command, request.get("args", {}))
+                result = self.server.context.execute(command, request.get("args", {}))
+                response = {"ok": True, "result": result}
+        except Exception as e:
+            logger.error("Daemon command failed: %s: %s", type(e).__name__, e)
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(response, default=str).encode("utf-8") + b"\n")
+
+
+class AgentDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serve CLI commands over a Unix socket, one JSON request line per connection."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str | None = None, context: AgentContext | None = None):
+        """Bind the socket (owner-only), replacing a stale one left by a dead daemon."""
+        self.socket_path = socket_path or default_socket_path()
+        self.context = context or AgentContext()
+        self.identity = identity()
+        if os.path.exists(self.socket_path):
+            try:
+                call("ping", socket_path=self.socket_path, timeout=CONNECT_TIMEOUT)
+            except DaemonUnavailable:
+                os.unlink(self.socket_path)
+            else:
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self) -> None:
+        """Close the socket and remove its file."""
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
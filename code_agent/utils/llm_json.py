@@ -0,0 +1,27 @@
+"""Parsing of JSON answers from LLM responses."""
+
+from __future__ import annotations
+
+import re
+from typing import TypeVar
+
+from pydantic import BaseModel
+
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.DOTALL)
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def extract_json(text: str) -> str:
+    """The JSON object inside a markdown code fence, else the stripped response."""
+    match = _JSON_FENCE_RE.search(text)
+    return match.group(1) if match else text.strip()
+
+
+def parse_json_model(text: str, model: type[M]) -> M:
+    """Parse a (possibly fenced) JSON LLM response into ``model``.
+
+    Raises ``ValueError`` (pydantic's ``ValidationError``) on malformed JSON or a
+    schema mismatch.
+    """
+    return model.model_validate_json(extract_json(text))
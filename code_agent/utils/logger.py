@@ -1,37 +1,158 @@
 """Logging utilities for Code Agent."""
 
+from __future__ import annotations
+
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import queue
 import sys
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, TextIO
+
+# Identifies one CLI invocation (or daemon command) across all of its log lines.
+RUN_ID = uuid.uuid4().hex[:12]
+
+# Record attributes copied into JSON lines when code passes them via ``extra=``.
+EXTRA_FIELDS = ("stage", "duration_s")
+
+_context: contextvars.ContextVar[dict[str, Any] | None] = contextvars.ContextVar(
+    "log_context", default=None
+)
+
+# Queue listener per configured logger name, so repeated setup replaces it.
+_listeners: dict[str, QueueListener] = {}
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Attach fields (run_id, issue, pr, stage, ...) to records logged in this context."""
+    token = _context.set(
+        {**(_context.get() or {}), **{key: value for key, value in fields.items() if value is not None}}
+    )
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Capture the caller's log context on the record before it crosses threads."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.log_context = {"run_id": RUN_ID, **(_context.get() or {})}
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        entry.update(getattr(record, "log_context", None) or {"run_id": RUN_ID})
+        for field in EXTRA_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener's handlers.
+
+    The stock ``prepare`` renders the message with this handler's formatter, which
+    would bake the plain-text layout (and traceback) into the JSON ``message``.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _stop_listeners() -> None:
+    for listener in _listeners.values():
+        listener.stop()
+    _listeners.clear()
+
+
+atexit.register(_stop_listeners)
 
 
 def setup_logger(
     name: str = "code_agent",
     level: str = "INFO",
     log_file: str | None = None,
+    json_format: bool | None = None,
+    stream: TextIO | None = None,
 ) -> logging.Logger:
-    """Setup and configure logger."""
+    """Setup and configure logger.
+
+    Records go through a ``QueueHandler`` and are written by a ``QueueListener`` thread,
+    so logging never blocks on the stream or file. ``json_format`` defaults to JSON
+    lines when the stream is not a TTY (CI job logs). Calling this again reconfigures
+    the logger instead of adding handlers.
+    """
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level.upper()))
 
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, level.upper()))
+    previous = _listeners.pop(name, None)
+    if previous is not None:
+        previous.stop()
+    for handler in list(logger.handlers):
+        if isinstance(handler, _QueueHandler):
+            logger.removeHandler(handler)
 
-    # Formatter
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    console_handler.setFormatter(formatter)
+    stream = stream or sys.stdout
+    if json_format is None:
+        json_format = not stream.isatty()
 
-    logger.addHandler(console_handler)
+    formatter: logging.Formatter
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+
+    # Console handler
+    console_handler = logging.StreamHandler(stream)
+    console_handler.setFormatter(formatter)
+    handlers: list[logging.Handler] = [console_handler]
 
     # File handler (optional)
     if log_file:
         file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(getattr(logging, level.upper()))
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
 
-    return logger
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
 
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
+
+    return logger
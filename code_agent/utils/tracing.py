@@ -0,0 +1,283 @@
+"""Lightweight, OpenTelemetry-compatible tracing with an OTLP/JSON file exporter.
+
+Spans are only recorded inside :func:`record`; elsewhere :func:`span` is a cheap no-op,
+so instrumented code pays nothing when no trace was requested. The output file uses
+the OTLP/JSON encoding (``resourceSpans``) that collectors and viewers such as Jaeger
+import directly, without running a collector.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+T = TypeVar("T")
+
+SERVICE_NAME = "code-agent"
+
+# OTLP span kind and status codes.
+_KIND_INTERNAL = 1
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+class Span:
+    """A timed operation with attributes; children are spans opened while it is current."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+        "message",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: str, attributes: dict[str, Any]):
+        """Start a span now."""
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = _STATUS_OK
+        self.message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute (None values are skipped)."""
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        """Mark the span failed."""
+        self.status = _STATUS_ERROR
+        self.message = f"{type(error).__name__}: {error}"[:500]
+        self.attributes["exception.type"] = type(error).__name__
+
+    def to_otlp(self) -> dict[str, Any]:
+        """OTLP/JSON representation."""
+        status: dict[str, Any] = {"code": self.status}
+        if self.message:
+            status["message"] = self.message
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": _KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": status,
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded by :func:`span` when nothing is being recorded."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, error: BaseException) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    """Finished spans of one traced run (thread-safe)."""
+
+    def __init__(self) -> None:
+        """Initialize trace."""
+        self.trace_id = secrets.token_hex(16)
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        """Record a finished span."""
+        with self._lock:
+            self.spans.append(span)
+
+    def to_otlp(self) -> dict[str, Any]:
+        """The trace as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        from code_agent import __version__
+
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _attribute("service.name", SERVICE_NAME),
+                            _attribute("service.version", __version__),
+                            _attribute("process.pid", os.getpid()),
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "code_agent", "version": __version__},
+                            "spans": [s.to_otlp() for s in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def write(self, path: str | Path) -> None:
+        """Write the trace as OTLP/JSON."""
+        Path(path).write_text(json.dumps(self.to_otlp()), encoding="utf-8")
+
+
+_trace: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("trace", default=None)
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("span", default=None)
+
+
+def _attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        encoded: dict[str, Any] = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def active() -> bool:
+    """Whether spans are being recorded in the current context."""
+    return _trace.get() is not None
+
+
+@contextmanager
+def record(path: str | Path | None = None) -> Iterator[Trace]:
+    """Record spans opened in this context (and contexts copied from it).
+
+    The trace is written to ``path`` on exit, also when the traced code raises.
+    """
+    trace = Trace()
+    trace_token = _trace.set(trace)
+    span_token = _current.set(None)
+    try:
+        yield trace
+    finally:
+        _current.reset(span_token)
+        _trace.reset(trace_token)
+        if path:
+            trace.write(path)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """Time the block as a child of the current span; exceptions mark it failed."""
+    trace = _trace.get()
+    if trace is None:
+        yield _NOOP
+        return
+
+    parent = _current.get()
+    current = Span(
+        name,
+        trace.trace_id,
+        parent.span_id if parent else "",
+        {k: v for k, v in attributes.items() if v is not None},
+    )
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        trace.add(current)
+
+
+def current_span() -> Span | _NoopSpan:
+    """The innermost open span, for adding attributes from inside traced code."""
+    if _trace.get() is None:
+        return _NOOP
+    return _current.get() or _NOOP
+
+
+def traced(name: str | None = None, **attributes: Any) -> Callable[[F], F]:
+    """Decorator running the function inside a span (named after it by default)."""
+
+    def decorator(fn: F) -> F:
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _trace.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name, **attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def trace_methods(prefix: str) -> Callable[[type[T]], type[T]]:
+    """Class decorator adding a ``{prefix}.{method}`` span to every public method.
+
+    Generator methods are left alone: their work happens after the call returns.
+    """
+
+    def decorator(cls: type[T]) -> type[T]:
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.isfunction(value):
+                continue
+            if inspect.isgeneratorfunction(value):
+                continue
+            setattr(cls, attr, _traced_method(f"{prefix}.{attr}", value))
+        return cls
+
+    return decorator
+
+
+def _traced_method(name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _trace.get() is None:
+            return fn(*args, **kwargs)
+        with span(name) as current:
+            result = fn(*args, **kwargs)
+            if isinstance(result, str | bytes):
+                current.set_attribute("result.bytes", len(result))
+            elif isinstance(result, list | dict):
+                current.set_attribute("result.items", len(result))
+            return result
+
+    return wrapper
+
+
+def bind_context(fn: Callable[..., T]) -> Callable[..., T]:
+    """Let ``fn`` run on worker threads with the caller's current span as parent."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        # A context can only be entered by one thread at a time; run each call in a copy.
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
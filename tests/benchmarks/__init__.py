@@ -0,0 +1 @@
+"""Microbenchmarks for Code Agent hot paths."""
@@ -0,0 +1,107 @@
+"""Synthetic fixtures for the benchmark suite.
+
+Benchmarks only run with ``--benchmark-only`` (``make bench``); a plain ``pytest`` run
+skips them. Repository sizes come from ``CODE_AGENT_BENCH_FILES`` (comma-separated
+file counts, e.g. ``10000,100000,500000``).
+"""
+
+import os
+import random
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import git
+import pytest
+
+BENCH_DIR = Path(__file__).parent
+
+REPO_SIZES = [int(n) for n in os.environ.get("CODE_AGENT_BENCH_FILES", "10000").split(",")]
+
+# Files per directory in the synthetic trees (~ a typical source package).
+FILES_PER_DIR = 50
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    """Skip benchmarks unless the run asked for them."""
+    if config.getoption("benchmark_only", default=False):
+        return
+    skip = pytest.mark.skip(reason="benchmarks run with --benchmark-only (make bench)")
+    for item in items:
+        if BENCH_DIR in item.path.parents:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", params=REPO_SIZES, ids=lambda n: f"{n}-files")
+def synthetic_repo(
+    request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory
+) -> Path:
+    """Git repository with ``n`` empty files in a three-level package tree."""
+    count = request.param
+    root = tmp_path_factory.mktemp(f"repo-{count}")
+    git.Repo.init(root)
+
+    for index in range(count):
+        directory = index // FILES_PER_DIR
+        path = root / f"pkg{directory // 400}" / f"sub{directory // 20 % 20}" / f"mod{directory}"
+        if index % FILES_PER_DIR == 0:
+            path.mkdir(parents=True)
+        (path / f"file_{index}.py").touch()
+    return root
+
+
+def _patch(rng: random.Random, lines: int) -> str:
+    body = []
+    for i in range(lines):
+        sign = rng.choice(" +-")
+        body.append(f"{sign}    value_{i} = compute(value_{i - 1}, {rng.randint(0, 999)})")
+    return f"@@ -1,{lines} +1,{lines} @@ def handler():\n" + "\n".join(body)
+
+
+@pytest.fixture(scope="session", params=[200, 2000], ids=lambda n: f"{n}-files")
+def pr_files(request: pytest.FixtureRequest) -> list[Any]:
+    """PyGithub-like changed files of a multi-MB pull request (~2 KB patch each)."""
+    rng = random.Random(request.param)
+    return [
+        SimpleNamespace(
+            filename=f"src/pkg{i // 50}/module_{i}.py",
+            status=rng.choice(["modified", "added", "removed"]),
+            additions=rng.randint(1, 40),
+            deletions=rng.randint(0, 40),
+            patch=_patch(rng, 40) if i % 10 else None,
+        )
+        for i in range(request.param)
+    ]
+
+
+@pytest.fixture(scope="session", params=[100_000, 2_000_000], ids=lambda n: f"{n // 1000}kB")
+def llm_response(request: pytest.FixtureRequest) -> str:
+    """Large LLM answer: prose mentioning file paths around a fenced code block."""
+    rng = random.Random(request.param)
+    prose, code = [], []
+    while sum(map(len, prose)) < request.param // 4:
+        n = rng.randint(0, 5000)
+        prose.append(
+            f"Update `app/services/service_{n}.py` and path: lib/util_{n}.py because the "
+            f"handler in module_{n}.py, (see tests/test_{n}.py) drops the retry.\n"
+        )
+    while sum(map(len, code)) < request.param * 3 // 4:
+        n = len(code)
+        code.append(f"def function_{n}(value):\n    return helper_{n}(value) + {n}\n\n")
+    text = "".join(prose)
+    return f"{text}\n```python\n{''.join(code)}```\n{text}"
+
+
+@pytest.fixture(scope="session", params=[50, 5000], ids=lambda n: f"{n}-checks")
+def ci_checks(request: pytest.FixtureRequest) -> list[dict[str, Any]]:
+    """Check runs as returned by ``GitHubClient.get_pr_checks``."""
+    return [
+        {
+            "id": i,
+            "name": f"job-{i} (py3.{8 + i % 5})",
+            "status": "completed",
+            "conclusion": "failure" if i % 7 == 0 else "success",
+            "output": "Tests failed: " + "assert x == y; " * 40 if i % 7 == 0 else None,
+        }
+        for i in range(request.param)
+    ]
@@ -0,0 +1,43 @@
+"""Benchmarks for the agents' text processing of LLM output and CI results."""
+
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from code_agent.agents.code_agent import CodeAgent  # noqa: E402
+from code_agent.agents.reviewer_agent import ReviewerAgent  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def code_agent(tmp_path_factory: pytest.TempPathFactory) -> CodeAgent:
+    import git
+
+    repo = tmp_path_factory.mktemp("agent-repo")
+    git.Repo.init(repo)
+    return CodeAgent(github_client=Mock(), llm_service=Mock(), repo_path=str(repo))
+
+
+def test_extract_file_paths(benchmark: Any, code_agent: CodeAgent, llm_response: str) -> None:
+    """Benchmark pulling candidate file paths out of a large LLM answer."""
+    paths = benchmark(code_agent._extract_file_paths, llm_response)
+
+    assert any(path.startswith("app/services/") for path in paths)
+
+
+def test_clean_code_response(benchmark: Any, code_agent: CodeAgent, llm_response: str) -> None:
+    """Benchmark extracting the fenced code block from a large LLM answer."""
+    code = benchmark(code_agent._clean_code_response, llm_response)
+
+    assert code.startswith("def function_0(value):")
+
+
+def test_format_ci_results(benchmark: Any, ci_checks: list[dict[str, Any]]) -> None:
+    """Benchmark rendering CI check runs for the review prompt."""
+    agent = ReviewerAgent(github_client=Mock(), llm_service=Mock())
+
+    text = benchmark(agent._format_ci_results, ci_checks)
+
+    assert text.count("\n- ") == len(ci_checks)
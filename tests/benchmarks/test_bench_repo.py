@@ -0,0 +1,31 @@
+"""Benchmarks for repository and pull request I/O assembly."""
+
+from pathlib import Path
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from code_agent.core.github_client import GitHubClient, GitRepo  # noqa: E402
+
+
+def test_get_repo_structure(benchmark: Any, synthetic_repo: Path) -> None:
+    """Benchmark walking a large working tree into the prompt's structure listing."""
+    git_repo = GitRepo(str(synthetic_repo))
+
+    structure = benchmark.pedantic(git_repo.get_repo_structure, rounds=3, iterations=1)
+
+    assert "file_0.py" in structure
+
+
+def test_get_pr_diff_assembly(benchmark: Any, pr_files: list[Any]) -> None:
+    """Benchmark joining per-file patches of a large pull request into one diff."""
+    client = GitHubClient.__new__(GitHubClient)
+    client.repo = Mock()
+    client.repo.get_pull.return_value.get_files.return_value = pr_files
+
+    diff = benchmark(client.get_pr_diff, 1)
+
+    assert diff.count("File: ") == len(pr_files)
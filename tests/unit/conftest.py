@@ -0,0 +1,30 @@
+"""Shared fixtures for unit tests."""
+
+from pathlib import Path
+
+import git
+import pytest
+
+
+@pytest.fixture
+def tmp_git_repo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Create a small git repository with one commit on ``main``."""
+    for var in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+        monkeypatch.setenv(var, "Test")
+    for var in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.setenv(var, "test@example.com")
+
+    repo = git.Repo.init(tmp_path, initial_branch="main")
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "cli.py").write_text(
+        '"""Command line interface."""\n\n\ndef parse_args(argv):\n    return argv\n',
+        encoding="utf-8",
+    )
+    (tmp_path / "app" / "database.py").write_text(
+        '"""Database connection pool."""\n\n\ndef open_connection(url):\n    return url\n',
+        encoding="utf-8",
+    )
+    (tmp_path / "README.md").write_text("# Demo\n", encoding="utf-8")
+    repo.git.add(A=True)
+    repo.index.commit("initial")
+    return tmp_path
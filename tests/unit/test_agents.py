@@ -1,9 +1,12 @@
 """Tests for agent modules."""
 
+from pathlib import Path
 from unittest.mock import Mock, patch
 
 from code_agent.agents.code_agent import CodeAgent
 from code_agent.agents.reviewer_agent import ReviewerAgent
+from code_agent.core.checkpoint import find_review_state, review_state_marker, run_fingerprint
+from code_agent.core.llm import PROMPT_VERSION
 
 
 def test_reviewer_agent_initialization() -> None:
@@ -28,6 +31,71 @@ def test_reviewer_agent_has_review_pull_request_method() -> None:
     assert callable(agent.review_pull_request)
 
 
+def test_review_covers_only_commits_since_last_review() -> None:
+    """Test a follow-up review sends the new commits plus the outstanding issues."""
+    mock_github = Mock()
+    pr = Mock(title="Fix CLI", body="Fixes #1")
+    pr.head.sha = "b" * 40
+    pr.base.ref = "main"
+    mock_github.get_pull_request.return_value = pr
+    mock_github.get_issue_details.return_value = {"title": "Fix CLI", "body": "Broken args"}
+    mock_github.get_pr_checks.return_value = []
+    previous = {"head": "a" * 40, "approved": False, "issues": ["cli.py: no tests"], "feedback": ""}
+    mock_github.list_pr_review_bodies.return_value = [
+        "Changes requested\n\n" + review_state_marker(previous)
+    ]
+    mock_github.get_compare_diff.return_value = (
+        "diff --git a/tests/test_cli.py b/tests/test_cli.py\n@@ -0,0 +1,4 @@\n"
+        "+def test_parse():\n+    args = parse_args([])\n+    assert args == []\n+\n"
+    )
+    mock_llm = Mock()
+    mock_llm.review_code_changes.return_value = {"approved": True, "feedback": "ok", "issues": []}
+
+    agent = ReviewerAgent(github_client=mock_github, llm_service=mock_llm)
+    result = agent.review_pull_request(5)
+
+    assert result["incremental"] is True
+    mock_github.get_compare_diff.assert_called_once_with("a" * 40, "b" * 40)
+    mock_github.get_pr_diff.assert_not_called()
+    assert mock_llm.review_code_changes.call_args.kwargs["previous_review"] == previous
+
+    posted = mock_github.create_review.call_args.kwargs["body"]
+    assert find_review_state([posted])["head"] == "b" * 40
+
+
+def test_generate_summary_reuses_review_of_same_head(tmp_git_repo: Path) -> None:
+    """Test the summary renders the stored review instead of reviewing again."""
+    mock_github = Mock(repo_name="octo/app")
+    mock_github.get_pull_request.return_value.head.sha = "c" * 40
+    mock_llm = Mock()
+    agent = ReviewerAgent(
+        github_client=mock_github, llm_service=mock_llm, repo_path=str(tmp_git_repo)
+    )
+    agent._store_review(3, "c" * 40, {"approved": True, "feedback": "Looks good", "issues": []})
+
+    summary = agent.generate_review_summary(3)
+
+    assert "APPROVED" in summary
+    assert "Looks good" in summary
+    mock_llm.review_code_changes.assert_not_called()
+    mock_github.create_review.assert_not_called()
+
+    # Without a local clone the marker of the posted review is used.
+    previous = {
+        "head": "c" * 40,
+        "approved": False,
+        "issues": ["no tests"],
+        "feedback": "Add tests",
+    }
+    mock_github.list_pr_review_bodies.return_value = ["Review\n" + review_state_marker(previous)]
+    summary = ReviewerAgent(
+        github_client=mock_github, llm_service=mock_llm
+    ).generate_review_summary(3)
+    assert "CHANGES REQUESTED" in summary
+    assert "1. no tests" in summary
+    mock_llm.review_code_changes.assert_not_called()
+
+
 @patch("code_agent.agents.code_agent.GitRepo")
 def test_code_agent_initialization(mock_git_repo: Mock) -> None:
     """Test CodeAgent initialization with mocks."""
@@ -51,3 +119,83 @@ def test_code_agent_has_process_issue_method(mock_git_repo: Mock) -> None:
     assert hasattr(agent, "process_issue")
     assert callable(agent.process_issue)
 
+
+def test_process_issue_resumes_from_checkpoint(tmp_git_repo: Path) -> None:
+    """Test a retried run skips completed stages and repeats no LLM calls."""
+    mock_github = Mock()
+    mock_github.get_issue_details.return_value = {"title": "Fix CLI", "body": "Broken args"}
+    mock_github.find_open_pull_request.return_value = None
+    mock_llm = Mock()
+    mock_llm.model_id = "test-model"
+    mock_llm.analyze_issue.return_value = {"analysis": "Change `app/cli.py`", "files_to_modify": []}
+    mock_llm.generate_code_changes.return_value = "def parse_args(argv):\n    return list(argv)\n"
+
+    agent = CodeAgent(github_client=mock_github, llm_service=mock_llm, repo_path=str(tmp_git_repo))
+
+    # No origin remote: the push stage fails after generation and commit succeeded.
+    first = agent.process_issue(1)
+    assert first["success"] is False
+    assert "push" in first["error"]
+
+    second = agent.process_issue(1)
+    assert second["success"] is False
+    # The checkpoint is keyed by the issue content, so every run re-reads the issue
+    # (an edit must start a fresh run); everything after it is resumed.
+    assert mock_github.get_issue_details.call_count == 2
+    assert mock_llm.analyze_issue.call_count == 1
+    assert mock_llm.generate_code_changes.call_count == 1
+
+
+def test_process_issue_reuses_open_pr_with_same_fingerprint(tmp_git_repo: Path) -> None:
+    """Test a redelivered issue returns the existing agent PR without recomputing."""
+    issue = {"title": "Fix CLI", "body": "Broken args"}
+    mock_github = Mock()
+    mock_github.get_issue_details.return_value = issue
+    mock_llm = Mock()
+    mock_llm.model_id = "test-model"
+    agent = CodeAgent(github_client=mock_github, llm_service=mock_llm, repo_path=str(tmp_git_repo))
+    base_sha = agent.git_repo.resolve_base("main")
+
+    open_pr = Mock(number=12)
+    open_pr.body = agent._pr_body(
+        1, issue, [], run_fingerprint(issue, base_sha, PROMPT_VERSION, "test-model")
+    )
+    open_pr.get_files.return_value = [Mock(filename="app/cli.py")]
+    mock_github.find_open_pull_request.return_value = open_pr
+
+    result = agent.process_issue(1)
+
+    assert result["success"] is True
+    assert result["reused"] is True
+    assert result["pr_number"] == 12
+    assert result["files_modified"] == ["app/cli.py"]
+    mock_llm.analyze_issue.assert_not_called()
+
+    # An edited issue no longer matches and runs the pipeline again.
+    mock_github.get_issue_details.return_value = {**issue, "body": "Broken args and flags"}
+    mock_llm.analyze_issue.return_value = {"analysis": "No change", "files_to_modify": []}
+    agent.process_issue(1)
+    mock_llm.analyze_issue.assert_called_once()
+
+
+def test_select_files_rejects_nonexistent_planned_paths(tmp_git_repo: Path) -> None:
+    """Test planned actions on missing or escaping paths are dropped before generation."""
+    agent = CodeAgent(github_client=Mock(), llm_service=Mock(), repo_path=str(tmp_git_repo))
+    analysis = {
+        "analysis": "Refactor the CLI",
+        "files_to_modify": [
+            {"path": "./app/cli.py", "action": "modify", "rationale": "parse flags"},
+            {"path": "app/ghost.py", "action": "modify", "rationale": ""},
+            {"path": "../outside.py", "action": "create", "rationale": ""},
+            {"path": "app/flags.py", "action": "create", "rationale": "new module"},
+            {"path": "README.md", "action": "delete", "rationale": "obsolete"},
+        ],
+    }
+
+    selected = agent._select_files("Refactor the CLI", analysis, "main")
+
+    assert [(item["path"], item["action"]) for item in selected] == [
+        ("app/cli.py", "modify"),
+        ("app/flags.py", "create"),
+        ("README.md", "delete"),
+    ]
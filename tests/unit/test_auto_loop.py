@@ -0,0 +1,115 @@
+"""Tests for the in-process review/fix loop."""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+from code_agent.agents.auto_loop import AutoLoop
+
+
+def _loop(tmp_git_repo: Path, reviews: list[dict], max_iterations: int = 3) -> AutoLoop:
+    github = Mock()
+    github.get_issue_details.return_value = {"title": "Fix CLI", "body": "Broken args"}
+    github.get_pull_request.return_value.head.sha = "f" * 40
+    loop = AutoLoop(
+        github_client=github,
+        llm_service=Mock(),
+        repo_path=str(tmp_git_repo),
+        max_iterations=max_iterations,
+    )
+    loop.code_agent = Mock()
+    loop.code_agent.process_issue.return_value = {"success": True, "pr_number": 7, "branch": "b"}
+    loop.code_agent.fix_pr_issues.return_value = {
+        "success": True,
+        "files_modified": ["a.py"],
+        "commit_sha": "f" * 40,
+    }
+    loop.reviewer = Mock()
+    loop.reviewer.review_pull_request.side_effect = reviews
+    return loop
+
+
+def test_stops_on_approval_and_reuses_issue_context(tmp_git_repo: Path) -> None:
+    """Test the loop fixes until approved, fetching the issue only once."""
+    loop = _loop(
+        tmp_git_repo,
+        [
+            {"approved": False, "feedback": "Handle empty argv", "issues": ["empty argv"]},
+            {"approved": True, "feedback": "LGTM", "issues": []},
+        ],
+    )
+
+    result = loop.run(3)
+
+    assert result["approved"] is True
+    assert result["stop_reason"] == "approved"
+    assert result["iterations"] == 1
+    assert loop.github_client.get_issue_details.call_count == 1
+    fix_kwargs = loop.code_agent.fix_pr_issues.call_args.kwargs
+    assert fix_kwargs["issue_description"] == "Fix CLI\n\nBroken args"
+
+
+def test_stops_when_feedback_repeats(tmp_git_repo: Path) -> None:
+    """Test identical feedback after a fix is treated as no progress."""
+    same = {"approved": False, "feedback": "Handle  empty argv", "issues": ["empty argv"]}
+    loop = _loop(tmp_git_repo, [same, dict(same, feedback="Handle empty argv")])
+
+    result = loop.run(3)
+
+    assert result["stop_reason"] == "no_progress"
+    assert result["success"] is False
+    assert loop.code_agent.fix_pr_issues.call_count == 1
+
+
+def test_stops_at_max_iterations(tmp_git_repo: Path) -> None:
+    """Test the loop gives up after max_iterations fixes."""
+    reviews = [
+        {"approved": False, "feedback": f"Problem {i}", "issues": [f"p{i}"]} for i in range(3)
+    ]
+    loop = _loop(tmp_git_repo, reviews, max_iterations=2)
+
+    result = loop.run(3)
+
+    assert result["stop_reason"] == "max_iterations"
+    assert loop.code_agent.fix_pr_issues.call_count == 2
+    assert loop.code_agent.fix_pr_issues.call_args.kwargs["max_iterations"] == 2
+
+
+def test_zero_max_iterations_only_reviews(tmp_git_repo: Path) -> None:
+    """Test max_iterations=0 is honoured instead of falling back to the setting."""
+    loop = _loop(tmp_git_repo, [{"approved": False, "feedback": "Nope", "issues": ["x"]}], 0)
+
+    result = loop.run(3)
+
+    assert result["stop_reason"] == "max_iterations"
+    assert result["iterations"] == 0
+    loop.code_agent.fix_pr_issues.assert_not_called()
+
+
+def test_review_waits_for_github_to_report_the_pushed_head(tmp_git_repo: Path) -> None:
+    """Test the next review only starts once the PR head is the pushed fix."""
+    loop = _loop(
+        tmp_git_repo,
+        [
+            {"approved": False, "feedback": "Handle empty argv", "issues": ["empty argv"]},
+            {"approved": True, "feedback": "LGTM", "issues": []},
+        ],
+    )
+    loop.HEAD_POLL_INTERVAL = 0
+    stale, pushed = Mock(), Mock()
+    stale.head.sha, pushed.head.sha = "e" * 40, "f" * 40
+    loop.github_client.get_pull_request.side_effect = [stale, stale, pushed]
+
+    result = loop.run(3)
+
+    assert result["stop_reason"] == "approved"
+    assert loop.github_client.get_pull_request.call_count == 3
+
+    # A head that never updates stops the loop instead of reviewing the old commit.
+    loop = _loop(tmp_git_repo, [{"approved": False, "feedback": "Nope", "issues": ["x"]}])
+    loop.HEAD_POLL_INTERVAL, loop.HEAD_WAIT_TIMEOUT = 0, 0
+    loop.github_client.get_pull_request.return_value = stale
+
+    result = loop.run(3)
+
+    assert result["stop_reason"] == "head_not_updated"
+    assert loop.reviewer.review_pull_request.call_count == 1
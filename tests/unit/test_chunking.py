@@ -0,0 +1,123 @@
+"""Tests for AST chunking of large modules."""
+
+from unittest.mock import Mock
+
+from code_agent.core.chunking import (
+    build_skeleton,
+    chunk_text,
+    hoist_imports,
+    insert_imports,
+    select_chunks,
+    split_chunks,
+)
+
+SOURCE = '''"""Module docstring."""
+
+import os
+
+LIMIT = 10
+
+
+@decorator
+def parse_port(value):
+    return int(value)
+
+
+class Server:
+    """A server."""
+
+    def start(self):
+        return os.getpid()
+
+    def stop(self):
+        return None
+'''
+
+
+def test_split_chunks_covers_every_line() -> None:
+    """Test chunks are contiguous, cover the module and split long classes by method."""
+    chunks = split_chunks(SOURCE, max_lines=3)
+
+    assert [c.name for c in chunks] == [
+        "<module code>",
+        "parse_port",
+        "Server",
+        "Server.start",
+        "Server.stop",
+    ]
+    assert chunks[0].start == 1
+    assert chunks[-1].end == len(SOURCE.splitlines())
+    for previous, current in zip(chunks, chunks[1:], strict=False):
+        assert current.start == previous.end + 1
+    assert chunk_text(SOURCE, chunks[1]).lstrip("\n").startswith("@decorator\ndef parse_port")
+    assert chunks[1].signature == "def parse_port(value):"
+
+    assert [c.name for c in split_chunks(SOURCE)][-1] == "Server"
+
+
+def test_select_chunks_and_skeleton() -> None:
+    """Test the issue selects matching definitions and the outline marks them."""
+    chunks = split_chunks(SOURCE)
+
+    selected = select_chunks(SOURCE, chunks, "parse_port rejects invalid values", limit=2)
+
+    assert [c.name for c in selected] == ["parse_port"]
+    assert select_chunks(SOURCE, chunks, "unrelated words", limit=2) == []
+
+    skeleton = build_skeleton(SOURCE, chunks, selected)
+    assert "parse_port (being edited)" in skeleton
+    assert "class Server:\n    ..." in skeleton
+    assert "import os" in skeleton
+    assert "return int(value)" not in skeleton
+
+
+def test_hoist_and_insert_imports() -> None:
+    """Test leading imports of a replacement move into the module import block."""
+    replacement = "import os\nimport re\n\ndef parse_port(value):\n    return int(value)\n"
+
+    rest, imports = hoist_imports(SOURCE, replacement)
+
+    assert imports == ["import re"]
+    assert rest.startswith("def parse_port")
+
+    updated = insert_imports(SOURCE, imports)
+    assert "import os\nimport re\n" in updated
+    assert insert_imports('"""Doc."""\nX = 1\n', ["import re"]) == '"""Doc."""\nimport re\nX = 1\n'
+
+
+def test_generate_chunked_only_rewrites_matching_chunks() -> None:
+    """Test chunked generation splices the LLM output for selected definitions only."""
+    from code_agent.agents.code_agent import CodeAgent
+
+    llm_service = Mock()
+    llm_service.generate_chunk_changes.return_value = (
+        "```python\nimport re\n\n@decorator\ndef parse_port(value):\n"
+        "    return int(re.sub(r'\\D', '', value))\n```"
+    )
+    agent = CodeAgent.__new__(CodeAgent)
+    agent.llm_service = llm_service
+
+    updated = agent._generate_chunked("parse_port accepts junk", "server.py", SOURCE)
+
+    llm_service.generate_chunk_changes.assert_called_once()
+    assert "import os\nimport re\n" in updated
+    assert "\n\n\n@decorator\ndef parse_port(value):\n    return int(re.sub(" in updated
+    assert updated.endswith("    def stop(self):\n        return None\n")
+
+
+def test_generate_chunked_keeps_imports_of_module_code() -> None:
+    """Test regenerating the module-level chunk leaves its import block in place."""
+    from code_agent.agents.code_agent import CodeAgent
+
+    source = "import os\nimport json\n\nLIMIT = 10\n\n\ndef load(path):\n    return path\n"
+    llm_service = Mock()
+    llm_service.generate_chunk_changes.return_value = (
+        "```python\nimport os\nimport json\n\nLIMIT = 20\n```"
+    )
+    agent = CodeAgent.__new__(CodeAgent)
+    agent.llm_service = llm_service
+
+    updated = agent._generate_chunked("Raise the LIMIT constant", "config.py", source)
+
+    assert updated.startswith("import os\nimport json\n\nLIMIT = 20\n")
+    assert updated.endswith("def load(path):\n    return path\n")
@@ -0,0 +1,70 @@
+"""Tests for CI log failure extraction."""
+
+from collections.abc import Iterator
+from unittest.mock import Mock
+
+from code_agent.agents.reviewer_agent import ReviewerAgent
+from code_agent.core.ci_logs import extract_failure_windows, failure_digest
+
+
+def _log(noise: int) -> Iterator[str]:
+    yield "2024-05-01T10:00:00.1234567Z Run pytest"
+    for i in range(noise):
+        yield f"2024-05-01T10:00:01.0000000Z collecting item {i}"
+    yield "    def test_parse():"
+    yield ">       assert parse_args([]) == []"
+    yield "E       AssertionError: assert None == []"
+    for i in range(noise):
+        yield f"progress line {i}"
+    yield "FAILED tests/test_cli.py::test_parse - AssertionError"
+    yield "##[error]Process completed with exit code 1."
+
+
+def test_extract_failure_windows_keeps_context_around_errors() -> None:
+    """Test windows hold the lines around markers, not the noise between them."""
+    windows = extract_failure_windows(_log(10_000), context=2, max_windows=4)
+
+    assert windows[0] == [
+        "    def test_parse():",
+        ">       assert parse_args([]) == []",
+        "E       AssertionError: assert None == []",
+        "progress line 0",
+        "progress line 1",
+    ]
+    assert windows[-1][-2:] == [
+        "FAILED tests/test_cli.py::test_parse - AssertionError",
+        "##[error]Process completed with exit code 1.",
+    ]
+    assert sum(len(w) for w in windows) < 20
+
+
+def test_extract_failure_windows_bounds_error_floods() -> None:
+    """Test only the first and the last windows survive many errors."""
+    lines = [f"E   error line {i}" for i in range(1000)]
+
+    windows = extract_failure_windows(lines, context=5, max_windows=3)
+
+    assert len(windows) == 3
+    assert windows[0][0] == "E   error line 0"
+    assert windows[-1][-1] == "E   error line 999"
+
+
+def test_failure_digest_in_review_ci_context() -> None:
+    """Test failed checks' log excerpts are appended for the reviewer."""
+    github = Mock()
+    github.iter_job_log_lines.side_effect = lambda job_id: _log(50)
+    agent = ReviewerAgent(github_client=github, llm_service=Mock())
+
+    digest = agent._ci_failure_digest(
+        [
+            {"id": 1, "name": "lint", "conclusion": "success"},
+            {"id": 2, "name": "tests", "conclusion": "failure"},
+        ]
+    )
+
+    github.iter_job_log_lines.assert_called_once_with(2)
+    assert "### tests" in digest
+    assert "AssertionError: assert None == []" in digest
+    assert "collecting item 5\n" not in digest
+
+    assert failure_digest([("tests", [["x" * 100]])], max_chars=50).endswith("[digest truncated]")
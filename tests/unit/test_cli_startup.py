@@ -0,0 +1,72 @@
+"""Short CLI commands must not load the heavy client libraries."""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Modules that only the commands doing real work may load.
+HEAVY_MODULES = (
+    "openai",
+    "anthropic",
+    "github",
+    "git",
+    "httpx",
+    "pydantic_settings",
+    "code_agent.agents",
+)
+
+# Typer's help formatter imports these itself, so only non-help runs are held to them.
+RENDER_MODULES = ("rich.markdown",)
+
+COMMANDS = (
+    "version",
+    "process-issue",
+    "process-issues",
+    "review-pr",
+    "fix-pr",
+    "auto-loop",
+    "generate-summary",
+    "daemon",
+)
+
+# Runs the CLI in-process, then reports what ended up in ``sys.modules``.
+_PROBE = """
+import json, runpy, sys
+sys.argv = ["code_agent"] + sys.argv[1:]
+try:
+    runpy.run_module("code_agent.cli", run_name="__main__")
+except SystemExit as exc:
+    if exc.code not in (None, 0):
+        raise
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _loaded_modules(args: tuple[str, ...]) -> list[str]:
+    """Run the CLI in a fresh interpreter and return the names of loaded modules."""
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE, *args],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "args",
+    [("version",), ("--help",)] + [(command, "--help") for command in COMMANDS],
+    ids=" ".join,
+)
+def test_short_commands_skip_heavy_imports(args: tuple[str, ...]) -> None:
+    """Test short commands and per-command help never load API clients."""
+    heavy_modules = HEAVY_MODULES if "--help" in args else HEAVY_MODULES + RENDER_MODULES
+    loaded = sorted(
+        name
+        for name in _loaded_modules(args)
+        if any(name == heavy or name.startswith(f"{heavy}.") for heavy in heavy_modules)
+    )
+    assert loaded == []
@@ -0,0 +1,103 @@
+"""Tests for the agent daemon and its socket client."""
+
+import threading
+from typing import Any
+
+import pytest
+
+from code_agent.daemon import AgentDaemon, DaemonError, DaemonUnavailable, call, run
+
+
+class _StubContext:
+    """Record executed commands instead of running agents."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+
+    def execute(self, command: str, args: dict[str, Any]) -> Any:
+        self.calls.append((command, args))
+        if command == "review_pr":
+            raise RuntimeError("boom")
+        return {"success": True, "command": command}
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / "agent.sock")
+    monkeypatch.setenv("CODE_AGENT_SOCKET", socket_path)
+    monkeypatch.setenv("CODE_AGENT_DAEMON", "1")
+    server = AgentDaemon(socket_path, context=_StubContext())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join(timeout=5)
+
+
+def test_commands_forward_to_running_daemon(daemon, tmp_path, monkeypatch) -> None:
+    """Test run() executes in the daemon with an absolute repository path."""
+    monkeypatch.chdir(tmp_path)
+
+    result = run("process_issue", issue_number=7, repo_path=".")
+
+    assert result == {"success": True, "command": "process_issue"}
+    assert daemon.context.calls == [
+        ("process_issue", {"issue_number": 7, "repo_path": str(tmp_path)})
+    ]
+    with pytest.raises(DaemonError, match="RuntimeError: boom"):
+        call("review_pr", pr_number=1)
+
+
+def test_daemon_rejects_other_repository(daemon, monkeypatch) -> None:
+    """Test a client with another repository or settings runs its command in-process."""
+    from code_agent.config import settings
+
+    context = _StubContext()
+    monkeypatch.setattr(settings, "github_repo", "someone/else")
+
+    with pytest.raises(DaemonUnavailable, match="different repository"):
+        call("generate_summary", pr_number=1)
+    assert run("generate_summary", context=context, pr_number=1)["success"] is True
+    assert context.calls == [("generate_summary", {"pr_number": 1})]
+
+    monkeypatch.setattr(settings, "github_repo", daemon.identity["repo"])
+    for name, value in [
+        ("github_token", "another-token"),
+        ("demo_mode", not settings.demo_mode),
+        ("llm_provider", "yandex"),
+        ("max_iterations", settings.max_iterations + 1),
+    ]:
+        with monkeypatch.context() as patched:
+            patched.setattr(settings, name, value)
+            with pytest.raises(DaemonUnavailable):
+                call("generate_summary", pr_number=1)
+    assert daemon.context.calls == []
+
+
+def test_forwarding_is_opt_in(daemon, monkeypatch) -> None:
+    """Test commands run in-process unless CODE_AGENT_DAEMON=1."""
+    monkeypatch.delenv("CODE_AGENT_DAEMON")
+    context = _StubContext()
+
+    run("generate_summary", context=context, pr_number=2)
+
+    assert context.calls == [("generate_summary", {"pr_number": 2})]
+    assert daemon.context.calls == []
+
+
+def test_run_falls_back_in_process_without_daemon(tmp_path, monkeypatch) -> None:
+    """Test commands run in-process when no daemon listens, and stale sockets are replaced."""
+    socket_path = tmp_path / "agent.sock"
+    monkeypatch.setenv("CODE_AGENT_SOCKET", str(socket_path))
+    context = _StubContext()
+
+    with pytest.raises(DaemonUnavailable):
+        call("ping")
+    assert run("generate_summary", context=context, pr_number=3)["command"] == "generate_summary"
+    assert context.calls == [("generate_summary", {"pr_number": 3})]
+
+    socket_path.touch()
+    server = AgentDaemon(str(socket_path), context=_StubContext())
+    server.server_close()
+    assert not socket_path.exists()
@@ -0,0 +1,158 @@
+"""Tests for local git repository operations."""
+
+from pathlib import Path
+
+import git
+import pytest
+
+from code_agent.core.github_client import GitRepo
+
+
+def test_commit_tree_builds_branch_without_checkout(tmp_git_repo: Path) -> None:
+    """Test commit_tree writes a commit and branch ref without touching the working tree."""
+    git_repo = GitRepo(str(tmp_git_repo))
+    base_sha = git_repo.head_sha()
+
+    commit_sha = git_repo.commit_tree(
+        "main",
+        {
+            "app/cli.py": "def parse_args(argv):\n    return list(argv)\n",
+            "app/new/module.py": "VALUE = 1\n",
+            "README.md": None,
+        },
+        "Agent change",
+        branch="agent/issue-1",
+    )
+
+    repo = git.Repo(tmp_git_repo)
+    commit = repo.commit("agent/issue-1")
+    assert commit.hexsha == commit_sha
+    assert commit.parents[0].hexsha == base_sha
+    assert commit.message.strip() == "Agent change"
+    assert git_repo.get_file_content_at("agent/issue-1", "app/new/module.py") == "VALUE = 1\n"
+    assert git_repo.get_file_content_at("agent/issue-1", "README.md") == ""
+    assert git_repo.get_file_content_at("agent/issue-1", "app/database.py").startswith('"""')
+
+    # Working tree and checked-out branch are untouched.
+    assert repo.active_branch.name == "main"
+    assert repo.head.commit.hexsha == base_sha
+    assert not repo.is_dirty(untracked_files=True)
+
+
+def test_commit_tree_refuses_checked_out_branch(tmp_git_repo: Path) -> None:
+    """Test commit_tree does not move the branch that is checked out."""
+    git_repo = GitRepo(str(tmp_git_repo))
+
+    with pytest.raises(ValueError):
+        git_repo.commit_tree("main", {"a.txt": "a\n"}, "msg", branch="main")
+
+
+def test_push_branch_leases_on_last_known_remote_sha(tmp_git_repo: Path, tmp_path: Path) -> None:
+    """Test pushes lease on the last pushed SHA and refuse concurrent remote updates."""
+    remote_path = tmp_path / "remote.git"
+    git.Repo.init(remote_path, bare=True)
+    repo = git.Repo(tmp_git_repo)
+    repo.create_remote("origin", str(remote_path))
+    remote = git.Repo(remote_path)
+
+    git_repo = GitRepo(str(tmp_git_repo))
+    git_repo.commit_tree("main", {"a.txt": "a\n"}, "a", branch="agent/issue-1")
+    git_repo.push_branch("agent/issue-1")
+    assert remote.commit("agent/issue-1").hexsha == repo.commit("agent/issue-1").hexsha
+
+    # Re-pushing a rewritten branch is allowed because the lease matches the remote.
+    git_repo.commit_tree("main", {"a.txt": "a2\n"}, "a2", branch="agent/issue-1")
+    git_repo.push_branch("agent/issue-1")
+    assert remote.commit("agent/issue-1").hexsha == repo.commit("agent/issue-1").hexsha
+
+    # Someone else updated the branch since our last push: the lease rejects the push.
+    other = repo.commit("main").hexsha
+    remote.git.update_ref("refs/heads/agent/issue-1", other)
+    git_repo.commit_tree("main", {"a.txt": "a3\n"}, "a3", branch="agent/issue-1")
+    with pytest.raises(git.GitCommandError):
+        git_repo.push_branch("agent/issue-1")
+    assert remote.commit("agent/issue-1").hexsha == other
+    git_repo.push_branch("agent/issue-1", expected_sha=other)
+    assert remote.commit("agent/issue-1").hexsha == repo.commit("agent/issue-1").hexsha
+
+
+def test_push_branch_without_tracking_ref_reads_remote_head(
+    tmp_git_repo: Path, tmp_path: Path
+) -> None:
+    """Test a fresh clone can re-push an agent branch left on the remote (e.g. closed PR)."""
+    remote_path = tmp_path / "remote.git"
+    git.Repo.init(remote_path, bare=True)
+    repo = git.Repo(tmp_git_repo)
+    repo.create_remote("origin", str(remote_path))
+    remote = git.Repo(remote_path)
+    remote.git.fetch(str(tmp_git_repo), "main:refs/heads/agent/issue-2")
+
+    git_repo = GitRepo(str(tmp_git_repo))
+    git_repo.commit_tree("main", {"b.txt": "b\n"}, "b", branch="agent/issue-2")
+    assert git_repo.ref_sha("refs/remotes/origin/agent/issue-2") is None
+    git_repo.push_branch("agent/issue-2")
+
+    assert remote.commit("agent/issue-2").hexsha == repo.commit("agent/issue-2").hexsha
+    assert git_repo.ref_sha("refs/remotes/origin/agent/issue-2") == remote.commit(
+        "agent/issue-2"
+    ).hexsha
+
+
+def test_get_pull_request_diff_uses_merge_base(tmp_git_repo: Path, tmp_path: Path) -> None:
+    """Test the local PR diff only contains the PR's own changes."""
+    remote_path = tmp_path / "remote.git"
+    remote = git.Repo.init(remote_path, bare=True)
+    repo = git.Repo(tmp_git_repo)
+    repo.create_remote("origin", str(remote_path))
+
+    git_repo = GitRepo(str(tmp_git_repo))
+    pr_sha = git_repo.commit_tree("main", {"app/cli.py": "def main():\n    pass\n"}, "pr")
+    main_sha = git_repo.commit_tree("main", {"README.md": "# Changed on main\n"}, "main moved")
+    repo.git.push("origin", f"{main_sha}:refs/heads/main", f"{pr_sha}:refs/pull/7/head")
+    assert remote.commit("refs/pull/7/head").hexsha == pr_sha
+
+    diff = git_repo.get_pull_request_diff(7, "main")
+
+    assert "app/cli.py" in diff
+    assert "+def main():" in diff
+    assert "README.md" not in diff
+
+
+def test_update_file_skips_unchanged_and_keeps_style(tmp_git_repo: Path) -> None:
+    """Test update_file skips identical content and preserves CRLF/trailing newlines."""
+    git_repo = GitRepo(str(tmp_git_repo))
+    target = tmp_git_repo / "win.txt"
+    target.write_bytes(b"one\r\ntwo\r\n")
+
+    assert git_repo.update_file("win.txt", "one\ntwo") is False
+    assert git_repo.update_file("win.txt", "one\ntwo\nthree\n\n\n") is True
+    assert target.read_bytes() == b"one\r\ntwo\r\nthree\r\n"
+
+    assert git_repo.update_file("pkg/new.py", "x = 1") is True
+    assert (tmp_git_repo / "pkg" / "new.py").read_bytes() == b"x = 1\n"
+    assert [p.name for p in (tmp_git_repo / "pkg").iterdir()] == ["new.py"]
+
+
+def test_update_file_refuses_binary_target(tmp_git_repo: Path) -> None:
+    """Test binary files are never overwritten with generated text."""
+    git_repo = GitRepo(str(tmp_git_repo))
+    (tmp_git_repo / "logo.png").write_bytes(b"\x89PNG\r\n\x00\x00")
+
+    with pytest.raises(ValueError):
+        git_repo.update_file("logo.png", "not an image")
+
+
+def test_commit_tree_without_git_identity(
+    tmp_git_repo: Path, tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test commits are still created when git has no user.name/user.email."""
+    for var in ("GIT_AUTHOR_NAME", "GIT_AUTHOR_EMAIL", "GIT_COMMITTER_NAME", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.delenv("EMAIL", raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path_factory.mktemp("home")))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    git_repo = GitRepo(str(tmp_git_repo))
+
+    sha = git_repo.commit_tree("main", {"app/cli.py": "X = 1\n"}, "validation")
+
+    assert git_repo.repo.commit(sha).committer.email == "code-agent@users.noreply.github.com"
@@ -0,0 +1,63 @@
+"""Tests for import-graph-based affected-test selection."""
+
+from pathlib import Path
+
+import git
+
+from code_agent.core.github_client import GitRepo
+from code_agent.core.import_graph import ImportGraph, extract_imports
+
+
+def _commit(root: Path, files: dict[str, str]) -> None:
+    for path, content in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content, encoding="utf-8")
+    repo = git.Repo(root)
+    repo.git.add(A=True)
+    repo.index.commit("update")
+
+
+def test_extract_imports_resolves_relative_imports() -> None:
+    """Test absolute and relative imports are reported as module names."""
+    source = "import os\nfrom . import database\nfrom ..core.util import helper\n"
+
+    imports = extract_imports(source, "pkg.app.cli")
+
+    assert "os" in imports
+    assert "pkg.app.database" in imports
+    assert "pkg.core.util" in imports
+
+
+def test_affected_tests_follows_transitive_imports(tmp_git_repo: Path) -> None:
+    """Test a change selects tests that import it directly or indirectly."""
+    _commit(
+        tmp_git_repo,
+        {
+            "app/__init__.py": "",
+            "app/service.py": "from app.database import open_connection\n",
+            "tests/test_service.py": "from app import service\n",
+            "tests/test_cli.py": "from app.cli import parse_args\n",
+        },
+    )
+    graph = ImportGraph(GitRepo(str(tmp_git_repo)))
+
+    assert graph.affected_tests(["app/database.py"]) == ["tests/test_service.py"]
+    assert graph.affected_tests(["app/cli.py", "tests/test_new.py"]) == [
+        "tests/test_cli.py",
+        "tests/test_new.py",
+    ]
+
+
+def test_graph_is_updated_incrementally(tmp_git_repo: Path) -> None:
+    """Test a new commit reuses cached imports for unchanged blobs."""
+    _commit(tmp_git_repo, {"tests/test_db.py": "import json\n"})
+    git_repo = GitRepo(str(tmp_git_repo))
+    first = ImportGraph(git_repo).get_graph()
+    assert ImportGraph(git_repo).affected_tests(["app/database.py"]) == []
+
+    _commit(tmp_git_repo, {"tests/test_db.py": "from app.database import open_connection\n"})
+    second = ImportGraph(git_repo).get_graph()
+
+    assert second["commit"] != first["commit"]
+    assert second["files"]["app/cli.py"] == first["files"]["app/cli.py"]
+    assert ImportGraph(git_repo).affected_tests(["app/database.py"]) == ["tests/test_db.py"]
@@ -0,0 +1,107 @@
+"""Tests for the persistent issue queue and batch runner."""
+
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+from code_agent.agents.batch_runner import BatchRunner
+from code_agent.core.issue_queue import STALE_AFTER, IssueQueue
+
+
+def test_queue_orders_by_priority_then_fifo(tmp_path: Path) -> None:
+    """Test claims return the highest priority first, then insertion order."""
+    queue = IssueQueue(str(tmp_path / "queue.sqlite3"))
+    queue.enqueue("o/r", 1)
+    queue.enqueue("o/r", 2, priority=5)
+    queue.enqueue("o/r", 3)
+    queue.enqueue("other/repo", 4, priority=10)
+
+    claimed = [queue.claim("o/r").issue_number for _ in range(3)]
+
+    assert claimed == [2, 1, 3]
+    assert queue.claim("o/r") is None
+
+
+def test_queue_persists_and_skips_done_issues(tmp_path: Path) -> None:
+    """Test state survives reopening; done issues are not re-enqueued, failed ones are."""
+    db_path = str(tmp_path / "queue.sqlite3")
+    queue = IssueQueue(db_path)
+    queue.enqueue("o/r", 1)
+    queue.enqueue("o/r", 2)
+    queue.complete(queue.claim("o/r").job_id, True, {"success": True})
+    queue.complete(queue.claim("o/r").job_id, False, {"success": False})
+    queue.close()
+
+    queue = IssueQueue(db_path)
+    assert queue.enqueue("o/r", 1) is False
+    assert queue.enqueue("o/r", 2) is True
+    assert queue.stats("o/r") == {"done": 1, "pending": 1}
+
+    assert queue.enqueue("o/r", 1, force=True) is True
+    assert queue.stats("o/r") == {"pending": 2}
+
+
+def test_batch_runner_processes_queue_and_reports(tmp_path: Path) -> None:
+    """Test the runner drains the queue and streams one result per issue."""
+    queue = IssueQueue(str(tmp_path / "queue.sqlite3"))
+    for number in (1, 2, 3):
+        queue.enqueue("o/r", number)
+
+    agent = Mock()
+    agent.process_issue.side_effect = lambda n: {"success": n != 2, "pr_number": 100 + n}
+    results: list[dict] = []
+
+    stats = BatchRunner(
+        queue, "o/r", agent_factory=lambda: agent, workers=2, on_result=results.append
+    ).run()
+
+    assert sorted(r["issue_number"] for r in results) == [1, 2, 3]
+    assert stats["processed"] == 3
+    assert stats["failed"] == 1
+    assert queue.stats("o/r") == {"done": 2, "failed": 1}
+
+
+def test_batch_runner_fails_job_when_agent_creation_fails(tmp_path: Path) -> None:
+    """Test a failing agent factory marks the claimed job failed instead of running."""
+    queue = IssueQueue(str(tmp_path / "queue.sqlite3"))
+    queue.enqueue("o/r", 1)
+
+    def broken_factory() -> Mock:
+        raise RuntimeError("no credentials")
+
+    results: list[dict] = []
+    stats = BatchRunner(queue, "o/r", agent_factory=broken_factory, on_result=results.append).run()
+
+    assert stats["failed"] == 1
+    assert results[0]["error"] == "RuntimeError: no credentials"
+    assert queue.stats("o/r") == {"failed": 1}
+
+
+def test_requeue_stale_keeps_jobs_of_live_owners(tmp_path: Path) -> None:
+    """Test only jobs whose owner process is gone or silent are requeued."""
+    finished = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    host = socket.gethostname()
+    queue = IssueQueue(str(tmp_path / "queue.sqlite3"))
+    for number in (1, 2, 3, 4):
+        queue.enqueue("o/r", number)
+
+    queue.claim("o/r")  # this process: still running
+    dead = queue.claim("o/r", owner=f"{host}:{finished.stdout.strip()}")
+    silent = queue.claim("o/r", owner="other-host:1")
+    queue.claim("o/r", owner="other-host:2")
+    queue._conn.execute(
+        "UPDATE jobs SET heartbeat_at = ? WHERE id = ?",
+        (time.time() - STALE_AFTER - 1, silent.job_id),
+    )
+
+    assert queue.requeue_stale("o/r") == 2
+    assert queue.stats("o/r") == {"pending": 2, "running": 2}
+    assert queue.claim("o/r").issue_number in (dead.issue_number, silent.issue_number)
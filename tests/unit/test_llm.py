@@ -30,3 +30,20 @@ def test_openai_provider_generate(mock_openai: Mock) -> None:
     assert result == "Test response"
     mock_client.chat.completions.create.assert_called_once()
 
+
+def test_analyze_issue_returns_structured_plan() -> None:
+    """Test analyze_issue requests JSON output and returns the planned file actions."""
+    mock_provider = Mock()
+    mock_provider.generate.return_value = (
+        '{"summary": "Validate ports", "files": '
+        '[{"path": "app/cli.py", "action": "modify", "rationale": "range check"}]}'
+    )
+    service = LLMService(provider=mock_provider)
+
+    analysis = service.analyze_issue("Reject invalid ports", "app/\n  cli.py")
+
+    assert analysis["analysis"] == "Validate ports"
+    assert analysis["files_to_modify"] == [
+        {"path": "app/cli.py", "action": "modify", "rationale": "range check"}
+    ]
+    assert mock_provider.generate.call_args.kwargs["response_format"] == {"type": "json_object"}
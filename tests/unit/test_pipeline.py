@@ -0,0 +1,108 @@
+"""Tests for the stage dependency-graph executor."""
+
+import threading
+import time
+
+import pytest
+
+from code_agent.core.pipeline import Pipeline
+
+
+def test_independent_stages_overlap() -> None:
+    """Test stages without dependencies between them run concurrently."""
+    # Both stages must be inside their functions at once to pass the barrier.
+    both_running = threading.Barrier(2, timeout=5)
+
+    def fetch(results: object) -> str:
+        both_running.wait()
+        return "issue"
+
+    def checkout(results: object) -> bool:
+        both_running.wait()
+        return True
+
+    pipeline = Pipeline(max_workers=3)
+    pipeline.add("fetch", fetch)
+    pipeline.add("checkout", checkout)
+    pipeline.add("analyze", lambda r: f"analysis of {r['fetch']}", deps=["fetch"])
+
+    results = pipeline.run()
+
+    assert results["analyze"] == "analysis of issue"
+    assert results["checkout"] is True
+
+
+def test_critical_path_follows_latest_blocker() -> None:
+    """Test the critical path walks back through the dependency that finished last."""
+    pipeline = Pipeline()
+    pipeline.add("fetch", lambda r: None)
+    pipeline.add("checkout", lambda r: None)
+    pipeline.add("analyze", lambda r: None, deps=["fetch", "checkout"])
+    timings = {"fetch": (0.0, 2.0), "checkout": (0.0, 1.0), "analyze": (2.0, 3.0)}
+    for name, (start, end) in timings.items():
+        pipeline.stages[name].start, pipeline.stages[name].end = start, end
+
+    assert pipeline.critical_path() == ["fetch", "analyze"]
+
+
+def test_exclusive_stages_never_overlap() -> None:
+    """Test stages sharing a resource run one at a time."""
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def stage(results: object) -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+
+    pipeline = Pipeline(max_workers=4)
+    for name in ("index", "graph", "generate"):
+        pipeline.add(name, stage, exclusive="git")
+    pipeline.run()
+
+    assert peak == 1
+    assert len(pipeline.report()["critical_path"]) == 3
+
+
+def test_failure_stops_dependent_stages() -> None:
+    """Test a failing stage is re-raised and its dependents never run."""
+    ran = []
+
+    def fail(results: object) -> None:
+        raise RuntimeError("fetch failed")
+
+    pipeline = Pipeline()
+    pipeline.add("fetch", fail)
+    pipeline.add("analyze", lambda r: ran.append("analyze"), deps=["fetch"])
+
+    with pytest.raises(RuntimeError, match="fetch failed"):
+        pipeline.run()
+    assert ran == []
+
+
+def test_stop_skips_remaining_stages() -> None:
+    """Test a stage can end the run early without an error."""
+    pipeline = Pipeline()
+    ran: list[str] = []
+
+    def check(results):
+        pipeline.stop()
+        return "unchanged"
+
+    pipeline.add("check", check)
+    pipeline.add("analyze", lambda r: ran.append("analyze"), deps=["check"])
+
+    assert pipeline.run() == {"check": "unchanged"}
+    assert ran == []
+    assert list(pipeline.report()["stages"]) == ["check"]
+
+
+def test_unknown_dependency_is_rejected() -> None:
+    """Test stages can only depend on registered stages."""
+    with pytest.raises(ValueError):
+        Pipeline().add("analyze", lambda r: None, deps=["fetch"])
@@ -0,0 +1,47 @@
+"""Tests for structured change plans."""
+
+import pytest
+from pydantic import ValidationError
+
+from code_agent.core.plan import FileAction, normalize_path, parse_plan, validate_actions
+
+
+def test_parse_plan_accepts_fenced_json() -> None:
+    """Test a plan wrapped in a markdown code fence is parsed."""
+    plan = parse_plan(
+        '```json\n{"summary": "Add flag", "files": '
+        '[{"path": "app/cli.py", "action": "modify", "rationale": "new flag"}]}\n```'
+    )
+
+    assert plan.summary == "Add flag"
+    assert plan.files[0].action == "modify"
+
+
+def test_parse_plan_rejects_unknown_actions() -> None:
+    """Test schema validation fails on actions outside modify/create/delete."""
+    with pytest.raises(ValidationError):
+        parse_plan('{"summary": "x", "files": [{"path": "a.py", "action": "rename"}]}')
+
+
+def test_normalize_path() -> None:
+    """Test planned paths are normalized and escaping paths are refused."""
+    assert normalize_path("./app//cli.py") == "app/cli.py"
+    assert normalize_path("/etc/passwd") is None
+    assert normalize_path("app/../../secret") is None
+    assert normalize_path(".git/config") is None
+
+
+def test_validate_actions_checks_existence() -> None:
+    """Test modify/delete need an existing file and create of an existing file is a modify."""
+    tracked = {"app/cli.py", "app/db.py"}
+    accepted, rejected = validate_actions(
+        [
+            FileAction(path="app/cli.py", action="create"),
+            FileAction(path="app/missing.py", action="delete"),
+            FileAction(path="app", action="create"),
+        ],
+        tracked,
+    )
+
+    assert [(a.path, a.action) for a in accepted] == [("app/cli.py", "modify")]
+    assert len(rejected) == 2
@@ -0,0 +1,100 @@
+"""Tests for static pre-review classification."""
+
+from unittest.mock import Mock
+
+from code_agent.agents.reviewer_agent import ReviewerAgent
+from code_agent.core.prereview import classify_file, prereview
+
+
+def _diff(path: str, removed: list[str], added: list[str], start: int = 1) -> str:
+    return (
+        f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n"
+        f"@@ -{start},{len(removed)} +{start},{len(added)} @@\n"
+        + "".join(f"-{line}\n" for line in removed)
+        + "".join(f"+{line}\n" for line in added)
+    )
+
+
+def test_classify_file_kinds() -> None:
+    """Test whitespace, AST-equivalent, docs and code changes are told apart."""
+    assert classify_file("app/a.py", _diff("app/a.py", ["x = 1  "], ["x = 1", ""])) == "formatting"
+    # Re-indentation is semantic in Python.
+    assert classify_file("app/a.py", _diff("app/a.py", ["    return x"], ["return x"])) == "code"
+
+    old = "value = call(a, b)\n"
+    new = "value = call(\n    a,\n    b,\n)\n"
+    rewrap = _diff("app/a.py", ["value = call(a, b)"], ["value = call(", "    a,", "    b,", ")"])
+    assert classify_file("app/a.py", rewrap) == "code"
+    assert classify_file("app/a.py", rewrap, old, new) == "formatting"
+
+    assert classify_file("README.md", _diff("README.md", ["Old"], ["New"])) == "docs"
+    assert classify_file("app/a.py", _diff("app/a.py", ["x = 1"], ["x = 2"])) == "code"
+
+
+def test_prereview_kinds_and_findings() -> None:
+    """Test the overall classification and syntax findings on changed files."""
+    docs = _diff("README.md", ["Old"], ["New"]) + _diff("app/a.py", ["x = 1 "], ["x = 1"])
+    assert prereview(docs)["kind"] == "docs"
+
+    small = _diff("app/a.py", ["LIMIT = 1"], ["LIMIT = 2"])
+    assert prereview(small)["kind"] == "small"
+    assert prereview(small, small_lines=1)["kind"] == "full"
+
+    broken = prereview(
+        small, read_old=lambda path: "LIMIT = 1\n", read_new=lambda path: "LIMIT = (2\n"
+    )
+    assert broken["findings"] and "SyntaxError" in broken["findings"][0]
+
+
+def test_moved_lines_are_not_formatting() -> None:
+    """Test moving a line within a hunk or between hunks is a code change."""
+    old = ["def handle(user):", "    check_permissions(user)", "    save(user)"]
+    new = ["def handle(user):", "    save(user)", "    check_permissions(user)"]
+    diff = (
+        "diff --git a/app/a.py b/app/a.py\n--- a/app/a.py\n+++ b/app/a.py\n"
+        "@@ -1,3 +1,3 @@\n def handle(user):\n-    check_permissions(user)\n"
+        "     save(user)\n+    check_permissions(user)\n"
+    )
+    assert classify_file("app/a.py", diff) == "code"
+    assert classify_file("app/a.py", diff, "\n".join(old), "\n".join(new)) == "code"
+
+    swapped = _diff("app/a.py", ["a()", "b()"], ["b()", "a()"])
+    assert classify_file("app/a.py", swapped) == "code"
+    assert prereview(diff)["kind"] == "small"
+
+
+def test_added_or_deleted_files_are_code() -> None:
+    """Test a new or removed file is never formatting, even if its AST is empty."""
+    comment_only = ["# Notes for later", ""]
+    added = (
+        "diff --git a/app/notes.py b/app/notes.py\nnew file mode 100644\n"
+        "--- /dev/null\n+++ b/app/notes.py\n@@ -0,0 +1,2 @@\n"
+        + "".join(f"+{line}\n" for line in comment_only)
+    )
+    deleted = _diff("app/old.py", comment_only, [], start=1).replace(" +1,0 @@", " +0,0 @@")
+
+    assert classify_file("app/notes.py", added, "", "# Notes for later\n\n") == "code"
+    assert classify_file("app/old.py", deleted, "# Notes for later\n\n", "") == "code"
+    result = prereview(added, read_old=lambda p: "", read_new=lambda p: "# Notes for later\n")
+    assert result["kind"] == "small"
+    assert result["verified"] is False
+
+
+def test_formatting_only_diff_is_approved_without_llm() -> None:
+    """Test only verified formatting-only diffs skip the LLM, and never if CI failed."""
+    llm = Mock()
+    llm.quick_review.return_value = {"approved": False, "feedback": "CI is red", "issues": []}
+    agent = ReviewerAgent(github_client=Mock(), llm_service=llm)
+    diff = _diff("app/a.py", ["x = 1  "], ["x = 1"])
+    verified = prereview(diff, read_old=lambda p: "x = 1  \n", read_new=lambda p: "x = 1\n")
+
+    result = agent._review_diff(diff, "Tidy", None, prereview=verified)
+
+    assert result["approved"] is True
+    llm.review_code_changes.assert_not_called()
+    llm.quick_review.assert_not_called()
+
+    # Without file contents the classification is unverified: quick LLM review.
+    agent._review_diff(diff, "Tidy", None, prereview=prereview(diff))
+    agent._review_diff(diff, "Tidy", "CI failed", prereview=verified, ci_failed=True)
+    assert llm.quick_review.call_count == 2
@@ -0,0 +1,37 @@
+"""Tests for lexical file ranking."""
+
+from pathlib import Path
+
+from code_agent.core.github_client import GitRepo
+from code_agent.core.retrieval import FileRanker, tokenize
+
+
+def test_tokenize_splits_identifiers() -> None:
+    """Test snake_case and camelCase identifiers are split into terms."""
+    terms = tokenize("def open_connection(): return HTTPClient")
+    assert "open" in terms
+    assert "connection" in terms
+    assert "openconnection" in terms
+    assert "http" in terms
+    assert "client" in terms
+    assert "def" not in terms
+
+
+def test_rank_prefers_matching_file(tmp_git_repo: Path) -> None:
+    """Test the file matching the issue text ranks first."""
+    ranker = FileRanker(GitRepo(str(tmp_git_repo)))
+
+    ranked = ranker.rank("Database connection leaks when open_connection fails", top_k=2)
+
+    assert ranked[0][0] == "app/database.py"
+    assert len(ranked) <= 2
+
+
+def test_rank_index_cached_per_commit(tmp_git_repo: Path) -> None:
+    """Test the index is persisted and reused for the same commit."""
+    git_repo = GitRepo(str(tmp_git_repo))
+    FileRanker(git_repo).rank("cli arguments")
+
+    cache_files = list(git_repo.state_dir("retrieval").glob("*.json"))
+    assert [p.stem for p in cache_files] == [git_repo.head_sha()]
+    assert FileRanker(git_repo).rank("cli arguments")[0][0] == "app/cli.py"
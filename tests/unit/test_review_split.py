@@ -0,0 +1,75 @@
+"""Tests for per-file review splitting."""
+
+from unittest.mock import Mock, patch
+
+from code_agent.agents.reviewer_agent import ReviewerAgent
+from code_agent.core.review_split import pack_pieces, split_diff
+
+
+def _file_diff(path: str, hunks: int, lines_per_hunk: int = 3) -> str:
+    text = f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n"
+    for hunk in range(hunks):
+        start = hunk * 20 + 1
+        text += f"@@ -{start},{lines_per_hunk} +{start},{lines_per_hunk} @@\n"
+        text += "".join(f"+line {hunk}.{i}\n" for i in range(lines_per_hunk))
+    return text
+
+
+def test_split_diff_handles_git_and_api_formats() -> None:
+    """Test both git diffs and GitHub files-API blocks split into per-file texts."""
+    git_diff = _file_diff("app/a.py", 1) + _file_diff("app/b.py", 2)
+    assert [path for path, _ in split_diff(git_diff)] == ["app/a.py", "app/b.py"]
+    assert "".join(text for _, text in split_diff(git_diff)) == git_diff
+
+    separator = "=" * 80
+    api_diff = (
+        f"\n{separator}\nFile: app/a.py\nStatus: modified\n{separator}\n@@ -1 +1 @@\n-a\n+b\n"
+        f"\n{separator}\nFile: app/b.py\nStatus: added\n{separator}\n@@ -0,0 +1 @@\n+c\n"
+    )
+    files = split_diff(api_diff)
+    assert [path for path, _ in files] == ["app/a.py", "app/b.py"]
+    assert files[1][1].startswith(f"{separator}\nFile: app/b.py")
+
+
+def test_pack_pieces_groups_small_files_and_splits_large_ones() -> None:
+    """Test small files share a piece and a large file is split by whole hunks."""
+    small = _file_diff("app/a.py", 1) + _file_diff("app/b.py", 1)
+    assert [p.paths for p in pack_pieces(small, 1000)] == [["app/a.py", "app/b.py"]]
+
+    large = _file_diff("app/big.py", 6, lines_per_hunk=10)
+    pieces = pack_pieces(small + large, 300)
+
+    big_parts = [p for p in pieces if p.paths == ["app/big.py"]]
+    assert len(big_parts) > 1
+    assert big_parts[0].label == f"app/big.py (part 1/{len(big_parts)})"
+    for piece in big_parts:
+        assert piece.text.startswith("diff --git a/app/big.py b/app/big.py\n")
+    assert sum(p.text.count("@@ -") for p in big_parts) == 6
+
+
+@patch("code_agent.agents.reviewer_agent.settings")
+def test_large_diff_is_reviewed_per_part_then_aggregated(mock_settings: Mock) -> None:
+    """Test large diffs take one call per part plus one aggregation call."""
+    mock_settings.review_split_chars = 200
+    mock_settings.review_workers = 2
+    llm = Mock()
+    llm.review_diff_piece.side_effect = lambda diff, label, issue: {
+        "approved": True,
+        "summary": f"ok {label}",
+        "issues": [],
+    }
+    llm.aggregate_reviews.return_value = {"approved": True, "feedback": "LGTM", "issues": []}
+    agent = ReviewerAgent(github_client=Mock(), llm_service=llm)
+
+    diff = _file_diff("app/a.py", 3) + _file_diff("app/b.py", 3)
+    result = agent._review_diff(diff, "Fix things", None)
+
+    assert result["feedback"] == "LGTM"
+    llm.review_code_changes.assert_not_called()
+    labels = [label for label, _ in llm.aggregate_reviews.call_args.args[0]]
+    assert len(labels) >= 2
+    assert sorted(labels) == sorted(c.args[1] for c in llm.review_diff_piece.call_args_list)
+
+    small = _file_diff("app/a.py", 1)
+    agent._review_diff(small, "Fix things", None)
+    llm.review_code_changes.assert_called_once_with(small, "Fix things", None, previous_review=None)
@@ -0,0 +1,59 @@
+"""Tests for mapping review feedback to files and line ranges."""
+
+from code_agent.core.targeting import expand_ranges, map_feedback_to_targets, replace_lines
+
+SOURCE = '''"""Module."""
+
+
+def first():
+    return 1
+
+
+def second():
+    value = 2
+    return value
+'''
+
+
+def test_map_feedback_uses_file_mentions_and_line_refs() -> None:
+    """Test file mentions, path:line and 'line N' references map to ranges."""
+    feedback = (
+        "In app/cli.py the error handling is wrong.\n"
+        "- line 12: catch ValueError\n"
+        "Also see app/db.py:3-4.\n"
+    )
+
+    targets = map_feedback_to_targets(feedback, [], ["app/cli.py", "app/db.py", "app/other.py"])
+
+    assert targets == {"app/cli.py": [(12, 12)], "app/db.py": [(3, 4)]}
+
+
+def test_map_feedback_uses_inline_comments_and_symbols() -> None:
+    """Test inline review comments and backticked symbols are resolved."""
+    comments = [{"path": "app/cli.py", "line": 8, "start_line": 6, "body": "rename"}]
+
+    targets = map_feedback_to_targets(
+        "Please simplify `second`.", comments, ["app/cli.py", "mod.py"], read_file=lambda _: SOURCE
+    )
+
+    assert targets["app/cli.py"][0] == (6, 8)
+    assert targets["mod.py"] == [(8, 10)]
+
+
+def test_map_feedback_without_targets_is_empty() -> None:
+    """Test generic feedback maps to nothing (caller falls back to all files)."""
+    assert map_feedback_to_targets("Address review comments", [], ["a.py"]) == {}
+
+
+def test_expand_ranges_widens_to_enclosing_function() -> None:
+    """Test a line range is widened to its enclosing definition."""
+    assert expand_ranges(SOURCE, "mod.py", [(9, 9)]) == [(8, 10)]
+    assert expand_ranges(SOURCE, "mod.py", [(1, 10)]) == []
+
+
+def test_replace_lines_splices_region() -> None:
+    """Test replacing a region keeps the rest of the file intact."""
+    updated = replace_lines(SOURCE, 8, 10, "def second():\n    return 2")
+
+    assert updated.endswith("def second():\n    return 2")
+    assert "def first():\n    return 1\n" in updated
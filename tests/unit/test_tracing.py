@@ -0,0 +1,56 @@
+"""Tests for span recording and the OTLP/JSON trace export."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from code_agent.core.github_client import GitRepo
+from code_agent.core.pipeline import Pipeline
+from code_agent.utils import tracing
+
+
+def _spans(path: Path) -> dict[str, dict]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    spans = data["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    return {span["name"]: span for span in spans}
+
+
+def test_pipeline_stages_nest_across_threads(tmp_path: Path) -> None:
+    """Test stage spans on worker threads keep the caller's span as parent."""
+
+    def fail(results: dict) -> None:
+        raise RuntimeError("boom")
+
+    pipeline = Pipeline(max_workers=2)
+    pipeline.add("fetch", lambda r: "issue")
+    pipeline.add("analyze", fail, deps=["fetch"])
+
+    out = tmp_path / "trace.json"
+    with pytest.raises(RuntimeError), tracing.record(out), tracing.span("run", issue=7):
+        pipeline.run()
+
+    spans = _spans(out)
+    root = spans["run"]
+    assert root["parentSpanId"] == ""
+    assert {"key": "issue", "value": {"intValue": "7"}} in root["attributes"]
+    assert spans["stage fetch"]["parentSpanId"] == root["spanId"]
+    assert spans["stage analyze"]["status"] == {"code": 2, "message": "RuntimeError: boom"}
+    assert len({span["traceId"] for span in spans.values()}) == 1
+    assert int(root["endTimeUnixNano"]) >= int(spans["stage analyze"]["endTimeUnixNano"])
+
+
+def test_git_commands_recorded_under_repo_methods(tmp_git_repo: Path, tmp_path: Path) -> None:
+    """Test GitRepo methods and the git commands they run become nested spans."""
+    git_repo = GitRepo(str(tmp_git_repo))
+    out = tmp_path / "trace.json"
+
+    assert git_repo.list_files()  # not recorded outside record()
+    with tracing.record(out):
+        files = git_repo.list_files()
+
+    spans = _spans(out)
+    assert set(spans) == {"git_repo.list_files", "git ls-tree"}
+    assert spans["git ls-tree"]["parentSpanId"] == spans["git_repo.list_files"]["spanId"]
+    attributes = {a["key"]: a["value"] for a in spans["git_repo.list_files"]["attributes"]}
+    assert attributes["result.items"] == {"intValue": str(len(files))}
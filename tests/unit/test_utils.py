@@ -1,8 +1,14 @@
 """Tests for utility functions."""
 
+import io
+import json
 import logging
 
-from code_agent.utils.logger import setup_logger
+import pytest
+from pydantic import BaseModel
+
+from code_agent.utils.llm_json import extract_json, parse_json_model
+from code_agent.utils.logger import log_context, setup_logger
 
 
 def test_setup_logger_basic() -> None:
@@ -27,3 +33,39 @@ def test_logger_has_handlers() -> None:
     logger = setup_logger("test_logger_handlers")
     assert len(logger.handlers) > 0
 
+
+def test_setup_logger_is_idempotent_and_emits_json() -> None:
+    """Test repeated setup keeps one handler and non-TTY streams get JSON lines."""
+    stream = io.StringIO()
+    logger = setup_logger("test_logger_json", stream=stream)
+    logger.propagate = False
+
+    with log_context(issue=42, stage="analyze"):
+        logger.info("Analyzed %d files", 3, extra={"duration_s": 1.5})
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        logger.exception("Failed")
+
+    # Reconfiguring stops the previous listener, which flushes its queue.
+    setup_logger("test_logger_json", stream=io.StringIO())
+    assert len(logger.handlers) == 1
+
+    first, second = (json.loads(line) for line in stream.getvalue().splitlines())
+    assert first["message"] == "Analyzed 3 files"
+    assert (first["issue"], first["stage"], first["duration_s"]) == (42, "analyze", 1.5)
+    assert first["run_id"] == second["run_id"]
+    assert "issue" not in second
+    assert "ValueError: bad" in second["exception"]
+
+
+def test_parse_json_model_accepts_fenced_and_bare_json() -> None:
+    """Test JSON answers are parsed with or without a markdown fence."""
+
+    class Answer(BaseModel):
+        ok: bool
+
+    assert extract_json('Sure:\n```json\n{"ok": true}\n```\nDone.') == '{"ok": true}'
+    assert parse_json_model('  {"ok": false}\n', Answer) == Answer(ok=False)
+    with pytest.raises(ValueError):
+        parse_json_model("not json", Answer)
@@ -0,0 +1,101 @@
+"""Tests for local pre-push validation."""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from code_agent.core.github_client import GitRepo
+from code_agent.core.validation import Validator, is_test_file
+
+
+def test_is_test_file() -> None:
+    """Test pytest module name detection."""
+    assert is_test_file("tests/test_cli.py")
+    assert is_test_file("pkg/cli_test.py")
+    assert not is_test_file("app/cli.py")
+
+
+def test_validate_reports_syntax_errors_per_file(tmp_git_repo: Path) -> None:
+    """Test a syntax error fails validation and is attributed to its file."""
+    validator = Validator(GitRepo(str(tmp_git_repo)), checks=["ast"])
+
+    result = validator.validate(
+        "main", {"app/cli.py": "def broken(:\n", "app/database.py": "X = 1\n"}
+    )
+
+    assert result["passed"] is False
+    assert list(result["failed_files"]) == ["app/cli.py"]
+    assert "SyntaxError" in result["failed_files"]["app/cli.py"][0]
+
+
+def test_validate_caches_by_tree_hash(tmp_git_repo: Path) -> None:
+    """Test identical trees are validated once."""
+    validator = Validator(GitRepo(str(tmp_git_repo)), checks=["ast"])
+    changes = {"app/cli.py": "def ok():\n    return 1\n"}
+
+    first = validator.validate("main", changes)
+    second = validator.validate("main", dict(changes))
+
+    assert first["passed"] is True
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["tree"] == first["tree"]
+
+
+def test_validate_timeouts_fail_and_are_not_cached(
+    tmp_git_repo: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a hung check fails validation, and only passing results are cached."""
+    monkeypatch.setattr(shutil, "which", lambda tool: f"/usr/bin/{tool}")
+
+    def hang(command: list[str], **kwargs: object) -> None:
+        raise subprocess.TimeoutExpired(command, kwargs.get("timeout") or 0)
+
+    monkeypatch.setattr(subprocess, "run", hang)
+    validator = Validator(GitRepo(str(tmp_git_repo)), checks=["ast", "pytest"], timeout=1)
+    changes = {"tests/test_cli.py": "def test_ok():\n    pass\n"}
+
+    first = validator.validate("main", changes)
+    second = validator.validate("main", changes)
+
+    assert first["passed"] is False
+    assert first["checks"]["pytest"] == {"status": "failed", "output": "Timed out after 1s"}
+    assert second["cached"] is False
+
+    # The same tree with other checks is a different cache entry.
+    ast_only = Validator(validator.git_repo, checks=["ast"])
+    assert ast_only.validate("main", changes)["passed"] is True
+    assert ast_only.validate("main", changes)["cached"] is True
+    with_black = Validator(validator.git_repo, checks=["ast", "black"])
+    assert with_black.validate("main", changes)["cached"] is False
+
+
+@pytest.mark.parametrize(
+    ("returncode", "output"),
+    [
+        (2, "ERROR collecting tests/test_cli.py\nInterrupted: 1 error during collection"),
+        (4, "ERROR: usage: pytest [options]"),
+        (1, "E   ModuleNotFoundError: No module named 'yaml'\n1 error during collection"),
+    ],
+)
+def test_pytest_environment_errors_are_not_attributed(
+    tmp_git_repo: Path, monkeypatch: pytest.MonkeyPatch, returncode: int, output: str
+) -> None:
+    """Test a suite that cannot run here fails validation without blaming changed files."""
+    monkeypatch.setattr(shutil, "which", lambda tool: f"/usr/bin/{tool}")
+    monkeypatch.setattr(
+        subprocess,
+        "run",
+        lambda command, **kwargs: subprocess.CompletedProcess(command, returncode, output, ""),
+    )
+    validator = Validator(GitRepo(str(tmp_git_repo)), checks=["ast", "pytest"])
+
+    result = validator.validate(
+        "main", {"app/cli.py": "X = 1\n", "tests/test_cli.py": "def test_ok():\n    pass\n"}
+    )
+
+    assert result["passed"] is False
+    assert result["checks"]["pytest"]["status"] == "error"
+    assert result["failed_files"] == {}